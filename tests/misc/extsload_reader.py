@@ -0,0 +1,623 @@
+# Bulk reader of Hub/Spoke storage through IExtSload, batched with IMulticall.
+#
+# Slot locations are derived from the storage layout emitted by forge, e.g.
+#   forge inspect Spoke storageLayout --json > spoke-layout.json
+#   forge inspect Hub storageLayout --json > hub-layout.json
+# so reading `_userPositions[user][reserveId]` or `_assets[assetId]` needs no hand-written slot
+# math. Slots are fetched with extSloads(bytes32[]) calls that are packed into multicall(bytes[])
+# calls, themselves sent as JSON-RPC batches over a small pool of keep-alive connections. All
+# reads are pinned to one block and cached, and structs are decoded into namedtuple records.
+#
+# ERC-7201 namespaced storage (NoncesKeyed, upgradeable dependencies) does not appear in the
+# forge layout; use erc7201Slot() as the base slot for those.
+#
+# Requires pycryptodome (keccak256).
+#
+# Usage, e.g. against anvil after deploying the protocol:
+#   python extsload_reader.py <rpcUrl> <spoke> <spoke-layout.json> [user ...]
+#
+# Without arguments, the script runs a self-check against an in-process JSON-RPC node that
+# implements multicall(extSloads) over a hand-written storage layout (a mapping to a struct with
+# packed members, a dynamic array, a string). The same self-check runs against anvil, using the
+# deployed Spoke bytecode (its extSloads/multicall) at an arbitrary address:
+#   anvil &
+#   cast rpc anvil_setCode 0x00000000000000000000000000000000000a11ce \
+#     $(forge inspect SpokeInstance deployedBytecode)
+#   python extsload_reader.py --self-check http://127.0.0.1:8545 0x00000000000000000000000000000000000a11ce
+import http.client
+import http.server
+import json
+import queue
+import sys
+import threading
+import urllib.parse
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from Crypto.Hash import keccak
+
+
+def keccak256(data):
+    return keccak.new(digest_bits=256, data=data).digest()
+
+
+def selector(signature):
+    return keccak256(signature.encode())[:4]
+
+
+EXT_SLOADS = selector("extSloads(bytes32[])")
+MULTICALL = selector("multicall(bytes[])")
+
+
+def erc7201Slot(namespace):
+    """keccak256(abi.encode(uint256(keccak256(namespace)) - 1)) & ~bytes32(uint256(0xff))"""
+    inner = int.from_bytes(keccak256(namespace.encode()), "big") - 1
+    return int.from_bytes(keccak256(inner.to_bytes(32, "big")), "big") & ~0xFF
+
+
+def word(value):
+    return (value % 2**256).to_bytes(32, "big")
+
+
+def staticLength(t):
+    """Length of a static array type, e.g. 3 for uint256[3]."""
+    return int(t["label"].rsplit("[", 1)[1][:-1])
+
+
+class StorageLayout:
+    """Slot arithmetic over a `forge inspect <Contract> storageLayout --json` output."""
+
+    def __init__(self, layout):
+        self.types = layout["types"]
+        self.variables = {v["label"]: v for v in layout["storage"]}
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def _encodeKey(self, keyType, key):
+        label = self.types[keyType]["label"]
+        if label in ("string", "bytes"):
+            return key.encode() if isinstance(key, str) else key
+        if isinstance(key, str):
+            # addresses, contracts and bytesN are given as hex
+            key = int(key, 16)
+        if label.startswith("bytes") and label != "bytes32":
+            size = int(self.types[keyType]["numberOfBytes"])
+            return key.to_bytes(size, "big") + bytes(32 - size)
+        return word(int(key))
+
+    def locate(self, variable, *path):
+        """Returns (slot, offset, typeId) of variable[k1][k2].member... given its path."""
+        entry = self.variables[variable]
+        slot, offset, typeId = int(entry["slot"]), entry["offset"], entry["type"]
+        for key in path:
+            t = self.types[typeId]
+            if t["encoding"] == "mapping":
+                slot = int.from_bytes(
+                    keccak256(self._encodeKey(t["key"], key) + word(slot)), "big"
+                )
+                offset, typeId = 0, t["value"]
+            elif t["encoding"] == "dynamic_array":
+                slot, offset, typeId = self._element(
+                    int.from_bytes(keccak256(word(slot)), "big"), t["base"], key
+                )
+            elif t["encoding"] == "inplace" and "members" in t:
+                member = next(m for m in t["members"] if m["label"] == key)
+                slot, offset, typeId = (
+                    slot + int(member["slot"]),
+                    member["offset"],
+                    member["type"],
+                )
+            elif t["encoding"] == "inplace" and "base" in t:
+                slot, offset, typeId = self._element(slot, t["base"], key)
+            else:
+                raise KeyError(f"cannot index {t['label']} with {key!r}")
+        return slot, offset, typeId
+
+    def _element(self, start, baseType, index):
+        size = int(self.types[baseType]["numberOfBytes"])
+        if size >= 32:
+            return start + index * (size // 32), 0, baseType
+        perSlot = 32 // size
+        return start + index // perSlot, (index % perSlot) * size, baseType
+
+    def fields(self, slot, offset, typeId, prefix=""):
+        """Flattens a value into (name, slot, offset, size, typeLabel) leaves.
+
+        Mappings and dynamic arrays are skipped.
+        """
+        t = self.types[typeId]
+        if t["encoding"] != "inplace":
+            return []
+        if "members" in t:
+            out = []
+            for member in t["members"]:
+                out += self.fields(
+                    slot + int(member["slot"]),
+                    member["offset"],
+                    member["type"],
+                    prefix + member["label"] + ".",
+                )
+            return out
+        if "base" in t:
+            # static array
+            out = []
+            for i in range(staticLength(t)):
+                out += self.fields(*self._element(slot, t["base"], i), prefix + f"{i}.")
+            return out
+        return [(prefix[:-1], slot, offset, int(t["numberOfBytes"]), t["label"])]
+
+    def assemble(self, typeId, values, prefix=""):
+        """Rebuilds a value from its decoded fields() leaves, keyed by name.
+
+        Structs become namedtuples, static arrays lists; mappings and dynamic arrays are None.
+        """
+        t = self.types[typeId]
+        if t["encoding"] != "inplace":
+            return None
+        if "members" in t:
+            return self.recordType(typeId)(
+                *(
+                    self.assemble(m["type"], values, prefix + m["label"] + ".")
+                    for m in t["members"]
+                )
+            )
+        if "base" in t:
+            return [
+                self.assemble(t["base"], values, prefix + f"{i}.")
+                for i in range(staticLength(t))
+            ]
+        return values[prefix[:-1]]
+
+    def recordType(self, typeId):
+        t = self.types[typeId]
+        name = t["label"].split(".")[-1].replace("struct ", "")
+        members = [m["label"] for m in t.get("members", [])]
+        return namedtuple(name, members) if members else None
+
+
+def decode(value, offset, size, typeLabel):
+    raw = (int.from_bytes(value, "big") >> (8 * offset)) & ((1 << (8 * size)) - 1)
+    if typeLabel == "bool":
+        return raw != 0
+    if typeLabel == "address" or typeLabel.startswith("contract "):
+        return "0x" + raw.to_bytes(20, "big").hex()
+    if typeLabel.startswith("int"):
+        return raw - (1 << (8 * size)) if raw >> (8 * size - 1) else raw
+    if typeLabel.startswith("bytes"):
+        return raw.to_bytes(size, "big")
+    # uintN, enums and user defined value types
+    return raw
+
+
+class RpcClient:
+    """JSON-RPC over a pool of persistent HTTP connections."""
+
+    def __init__(self, url, poolSize=4):
+        parsed = urllib.parse.urlparse(url)
+        connectionType = (
+            http.client.HTTPSConnection
+            if parsed.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self.path = parsed.path or "/"
+        self.poolSize = poolSize
+        self.pool = queue.Queue()
+        for _ in range(poolSize):
+            self.pool.put(connectionType(parsed.hostname, parsed.port, timeout=60))
+
+    def batch(self, calls):
+        """Sends [(method, params)] as one JSON-RPC batch and returns the results in order."""
+        body = json.dumps(
+            [
+                {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+                for i, (method, params) in enumerate(calls)
+            ]
+        )
+        connection = self.pool.get()
+        try:
+            connection.request(
+                "POST", self.path, body, {"Content-Type": "application/json"}
+            )
+            response = json.loads(connection.getresponse().read())
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            raise
+        finally:
+            self.pool.put(connection)
+        if isinstance(response, dict):
+            raise RuntimeError(response.get("error", response))
+        results = {r["id"]: r for r in response}
+        for r in results.values():
+            if "error" in r:
+                raise RuntimeError(r["error"])
+        return [results[i]["result"] for i in range(len(calls))]
+
+    def call(self, method, params):
+        return self.batch([(method, params)])[0]
+
+
+def encodeExtSloads(slots):
+    return EXT_SLOADS + word(0x20) + word(len(slots)) + b"".join(word(s) for s in slots)
+
+
+def encodeMulticall(calls):
+    head = b""
+    tail = b""
+    for data in calls:
+        head += word(32 * len(calls) + len(tail))
+        tail += word(len(data)) + data + bytes(-len(data) % 32)
+    return MULTICALL + word(0x20) + word(len(calls)) + head + tail
+
+
+def decodeBytes32Array(data, start=0):
+    offset = start + int.from_bytes(data[start : start + 32], "big")
+    length = int.from_bytes(data[offset : offset + 32], "big")
+    return [data[offset + 32 * (i + 1) : offset + 32 * (i + 2)] for i in range(length)]
+
+
+def decodeMulticall(data):
+    offset = int.from_bytes(data[:32], "big")
+    length = int.from_bytes(data[offset : offset + 32], "big")
+    base = offset + 32
+    results = []
+    for i in range(length):
+        itemOffset = base + int.from_bytes(
+            data[base + 32 * i : base + 32 * (i + 1)], "big"
+        )
+        itemLength = int.from_bytes(data[itemOffset : itemOffset + 32], "big")
+        results.append(data[itemOffset + 32 : itemOffset + 32 + itemLength])
+    return results
+
+
+class ExtSloadReader:
+    """Block pinned, cached storage reader of one IExtSload + IMulticall contract."""
+
+    def __init__(
+        self,
+        rpc,
+        address,
+        layout,
+        block=None,
+        slotsPerCall=512,
+        callsPerMulticall=8,
+        multicallsPerBatch=4,
+    ):
+        self.rpc = rpc
+        self.address = address
+        self.layout = layout
+        self.block = (
+            hex(block) if block is not None else rpc.call("eth_blockNumber", [])
+        )
+        self.slotsPerCall = slotsPerCall
+        self.callsPerMulticall = callsPerMulticall
+        self.multicallsPerBatch = multicallsPerBatch
+        self.cache = {}
+        self.rpcRequests = 0
+
+    def _ethCall(self, data):
+        return (
+            "eth_call",
+            [{"to": self.address, "data": "0x" + data.hex()}, self.block],
+        )
+
+    def _fetchBatch(self, chunks):
+        calls = []
+        for i in range(0, len(chunks), self.callsPerMulticall):
+            group = chunks[i : i + self.callsPerMulticall]
+            calls.append(
+                self._ethCall(encodeMulticall([encodeExtSloads(c) for c in group]))
+            )
+        results = self.rpc.batch(calls)
+        values = []
+        for result in results:
+            for item in decodeMulticall(bytes.fromhex(result[2:])):
+                values += decodeBytes32Array(item)
+        return values
+
+    def load(self, slots):
+        """Fetches every uncached slot; returns {slot: bytes32}."""
+        missing = list(dict.fromkeys(s for s in slots if s not in self.cache))
+        chunks = [
+            missing[i : i + self.slotsPerCall]
+            for i in range(0, len(missing), self.slotsPerCall)
+        ]
+        perBatch = self.callsPerMulticall * self.multicallsPerBatch
+        batches = [chunks[i : i + perBatch] for i in range(0, len(chunks), perBatch)]
+        with ThreadPoolExecutor(max_workers=self.rpc.poolSize) as pool:
+            for batch, values in zip(batches, pool.map(self._fetchBatch, batches)):
+                self.rpcRequests += 1
+                self.cache.update(zip((s for c in batch for s in c), values))
+        return {s: self.cache[s] for s in slots}
+
+    def read(self, requests):
+        """Reads many values at once; each request is (variable, *path).
+
+        Structs are returned as namedtuples, static arrays as lists, other values decoded
+        according to their type.
+        """
+        located = [self.layout.locate(*request) for request in requests]
+        for request, (_, _, typeId) in zip(requests, located):
+            t = self.layout.types[typeId]
+            if t["encoding"] != "inplace":
+                raise ValueError(
+                    f"{request} is a {t['label']}, which is not stored in place; "
+                    "read its elements instead"
+                )
+        leaves = [self.layout.fields(*location) for location in located]
+        words = self.load([leaf[1] for fields in leaves for leaf in fields])
+        out = []
+        for (_, _, typeId), fields in zip(located, leaves):
+            values = {
+                name: decode(words[slot], offset, size, label)
+                for name, slot, offset, size, label in fields
+            }
+            out.append(self.layout.assemble(typeId, values))
+        return out
+
+
+class StubNode(http.server.ThreadingHTTPServer):
+    """Minimal JSON-RPC node: one contract answering multicall(extSloads) from a storage dict."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubNodeHandler)
+        self.storage = {}
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def respond(self, method, params):
+        if method == "eth_blockNumber":
+            return "0x1"
+        if method == "evm_mine":
+            return "0x0"
+        if method == "anvil_setStorageAt":
+            self.storage[int(params[1], 16)] = bytes.fromhex(params[2][2:])
+            return True
+        if method == "eth_call":
+            data = bytes.fromhex(params[0]["data"][2:])
+            assert data[:4] == MULTICALL
+            results = []
+            for call in _abiDynamicItems(data[4:]):
+                assert call[:4] == EXT_SLOADS
+                slots = [int.from_bytes(s, "big") for s in _abiStaticItems(call[4:])]
+                values = [self.storage.get(s, bytes(32)) for s in slots]
+                # ExtSload returns the abi-encoded bytes32[] directly
+                results.append(word(0x20) + word(len(values)) + b"".join(values))
+            return "0x" + _abiEncodeBytesArray(results).hex()
+        raise ValueError(f"unsupported method {method}")
+
+
+class StubNodeHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        calls = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        body = json.dumps(
+            [
+                {
+                    "jsonrpc": "2.0",
+                    "id": c["id"],
+                    "result": self.server.respond(c["method"], c["params"]),
+                }
+                for c in calls
+            ]
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _abiWordAt(data, position):
+    return int.from_bytes(data[position : position + 32], "big")
+
+
+def _abiStaticItems(data):
+    """bytes32[] argument at the start of data."""
+    start = _abiWordAt(data, 0)
+    return [
+        data[start + 32 * (i + 1) : start + 32 * (i + 2)]
+        for i in range(_abiWordAt(data, start))
+    ]
+
+
+def _abiDynamicItems(data):
+    """bytes[] argument at the start of data."""
+    start = _abiWordAt(data, 0) + 32
+    items = []
+    for i in range(_abiWordAt(data, start - 32)):
+        item = start + _abiWordAt(data, start + 32 * i)
+        items.append(data[item + 32 : item + 32 + _abiWordAt(data, item)])
+    return items
+
+
+def _abiEncodeBytesArray(items):
+    offsets, tails, position = [], [], 32 * len(items)
+    for item in items:
+        offsets.append(word(position))
+        tail = word(len(item)) + item + bytes(-len(item) % 32)
+        tails.append(tail)
+        position += len(tail)
+    return word(0x20) + word(len(items)) + b"".join(offsets) + b"".join(tails)
+
+
+# Hand-written forge storage layout of
+#   uint256 _reserveCount;
+#   mapping(uint256 => Reserve) _reserves;  // Reserve {address hub; uint16 assetId; bool paused;
+#                                           //          uint128 cap; int64 delta}
+#   address[] _users;
+#   string _name;
+SELF_CHECK_LAYOUT = {
+    "storage": [
+        {"label": "_reserveCount", "offset": 0, "slot": "0", "type": "t_uint256"},
+        {
+            "label": "_reserves",
+            "offset": 0,
+            "slot": "1",
+            "type": "t_mapping(t_uint256,t_struct(Reserve)1_storage)",
+        },
+        {
+            "label": "_users",
+            "offset": 0,
+            "slot": "2",
+            "type": "t_array(t_address)dyn_storage",
+        },
+        {"label": "_name", "offset": 0, "slot": "3", "type": "t_string_storage"},
+        {
+            "label": "_caps",
+            "offset": 0,
+            "slot": "4",
+            "type": "t_array(t_uint128)3_storage",
+        },
+    ],
+    "types": {
+        "t_address": {"encoding": "inplace", "label": "address", "numberOfBytes": "20"},
+        "t_bool": {"encoding": "inplace", "label": "bool", "numberOfBytes": "1"},
+        "t_int64": {"encoding": "inplace", "label": "int64", "numberOfBytes": "8"},
+        "t_uint16": {"encoding": "inplace", "label": "uint16", "numberOfBytes": "2"},
+        "t_uint128": {"encoding": "inplace", "label": "uint128", "numberOfBytes": "16"},
+        "t_uint256": {"encoding": "inplace", "label": "uint256", "numberOfBytes": "32"},
+        "t_string_storage": {
+            "encoding": "bytes",
+            "label": "string",
+            "numberOfBytes": "32",
+        },
+        "t_array(t_uint128)3_storage": {
+            "encoding": "inplace",
+            "label": "uint128[3]",
+            "numberOfBytes": "64",
+            "base": "t_uint128",
+        },
+        "t_array(t_address)dyn_storage": {
+            "encoding": "dynamic_array",
+            "label": "address[]",
+            "numberOfBytes": "32",
+            "base": "t_address",
+        },
+        "t_mapping(t_uint256,t_struct(Reserve)1_storage)": {
+            "encoding": "mapping",
+            "key": "t_uint256",
+            "label": "mapping(uint256 => struct Reserve)",
+            "numberOfBytes": "32",
+            "value": "t_struct(Reserve)1_storage",
+        },
+        "t_struct(Reserve)1_storage": {
+            "encoding": "inplace",
+            "label": "struct Reserve",
+            "numberOfBytes": "64",
+            "members": [
+                {"label": "hub", "offset": 0, "slot": "0", "type": "t_address"},
+                {"label": "assetId", "offset": 20, "slot": "0", "type": "t_uint16"},
+                {"label": "paused", "offset": 22, "slot": "0", "type": "t_bool"},
+                {"label": "cap", "offset": 0, "slot": "1", "type": "t_uint128"},
+                {"label": "delta", "offset": 16, "slot": "1", "type": "t_int64"},
+            ],
+        },
+    },
+}
+
+
+def selfCheck(rpcUrl=None, address="0x" + "00" * 19 + "01"):
+    """Seeds storage with hand-computed slots and words, then reads it back through the reader."""
+    # calldata of multicall([extSloads([1, 2**256 - 1]), extSloads([])]), as encoded by eth-abi
+    calldata = encodeMulticall([encodeExtSloads([1, 2**256 - 1]), encodeExtSloads([])])
+    assert (
+        keccak256(calldata).hex()
+        == "f36affb52aae652e55a0b2dc9059b6f41965a32799af4c77745e93731c4caf3b"
+    )
+
+    node = StubNode() if rpcUrl is None else None
+    rpc = RpcClient(rpcUrl or node.url)
+    reserveCount = 40
+    users = [f"0x{i:040x}" for i in (0xA11CE, 0xB0B)]
+    caps = [7, 2**128 - 1, 9]
+    storage = {
+        0: reserveCount,
+        2: len(users),
+        4: caps[0] | (caps[1] << 128),
+        5: caps[2],
+    }
+    usersSlot = int.from_bytes(keccak256(word(2)), "big")
+    for i, user in enumerate(users):
+        storage[usersSlot + i] = int(user, 16)
+    for i in range(reserveCount):
+        reserveSlot = int.from_bytes(keccak256(word(i) + word(1)), "big")
+        storage[reserveSlot] = (0xCAFE0000 + i) | (i << 160) | ((i % 2) << 176)
+        storage[reserveSlot + 1] = (10**24 + i) | (((-i - 1) % 2**64) << 128)
+    for slot, value in storage.items():
+        rpc.call("anvil_setStorageAt", [address, hex(slot), "0x" + word(value).hex()])
+    rpc.call("evm_mine", [])
+
+    reader = ExtSloadReader(
+        rpc,
+        address,
+        StorageLayout(SELF_CHECK_LAYOUT),
+        slotsPerCall=3,
+        callsPerMulticall=2,
+        multicallsPerBatch=2,
+    )
+    reserves = reader.read([("_reserves", i) for i in range(reserveCount)])
+    for i, reserve in enumerate(reserves):
+        assert reserve == (
+            f"0x{0xCAFE0000 + i:040x}",
+            i,
+            i % 2 == 1,
+            10**24 + i,
+            -i - 1,
+        ), reserve
+    assert reader.read(
+        [("_reserveCount",), ("_users", 1), ("_reserves", 7, "delta"), ("_users", 0)]
+    ) == [reserveCount, users[1], -8, users[0]]
+    # a static array is stored in place, two uint128 per slot
+    assert reader.read([("_caps",), ("_caps", 2)]) == [caps, caps[2]]
+    for request in [("_reserves",), ("_users",), ("_name",)]:
+        try:
+            reader.read([request])
+        except ValueError:
+            continue
+        raise AssertionError(f"reading {request} did not fail")
+    if node is not None:
+        node.shutdown()
+    return len(reader.cache), reader.rpcRequests
+
+
+if __name__ == "__main__":
+    assert erc7201Slot("aave-v4.storage.NoncesKeyed") == int(
+        "0x474d4a5585c1bae3dbeb574bb96408c7174aadd8ab635de4ab498e2723195f00", 16
+    )
+    selfCheckRequested = sys.argv[1:2] == ["--self-check"]
+    if selfCheckRequested or len(sys.argv) < 4:
+        slots, requests = (
+            selfCheck(*sys.argv[2:4]) if selfCheckRequested else selfCheck()
+        )
+        print(f"✅ Self-check: {slots} slots decoded from {requests} RPC requests.")
+        if not selfCheckRequested:
+            print("usage: extsload_reader.py <rpcUrl> <spoke> <layout.json> [user ...]")
+        sys.exit(0)
+
+    rpcUrl, spoke, layoutPath, users = (
+        sys.argv[1],
+        sys.argv[2],
+        sys.argv[3],
+        sys.argv[4:],
+    )
+    reader = ExtSloadReader(RpcClient(rpcUrl), spoke, StorageLayout.load(layoutPath))
+    (reserveCount,) = reader.read([("_reserveCount",)])
+    reserves = reader.read([("_reserves", i) for i in range(reserveCount)])
+    positions = reader.read(
+        [("_userPositions", user, i) for user in users for i in range(reserveCount)]
+    )
+    print(f"block {int(reader.block, 16)}: {reserveCount} reserves")
+    for reserveId, reserve in enumerate(reserves):
+        print(f"  reserve {reserveId}: {reserve}")
+    for k, position in enumerate(positions):
+        user, reserveId = users[k // reserveCount], k % reserveCount
+        if any(position):
+            print(f"  {user} reserve {reserveId}: {position}")
+    print(f"{len(reader.cache)} slots read in {reader.rpcRequests} RPC requests")
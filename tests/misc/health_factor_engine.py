@@ -0,0 +1,386 @@
+# Reference engine that keeps Spoke health factors up to date under reserve updates
+# (oracle price, drawnIndex, supply exchange rate) by recomputing only the users that hold
+# the updated reserve.
+#
+# Per user, the engine keeps the two aggregates the health factor is made of (collateral
+# value weighted by collateral factor, and total debt value with full RAY precision)
+# together with each position's contribution to them. A reserve update walks the
+# reserve -> users inverted index, swaps the affected users' old contributions for the new
+# ones and reports the users whose health factor crosses HEALTH_FACTOR_LIQUIDATION_THRESHOLD.
+# All math is exact integer math, so the result is identical to a full recomputation with
+# Spoke._processUserAccountData, which the benchmark below cross-checks on every update.
+#
+# Only the user ids of the inverted index are stored in fixed-width arrays (array("q")) and the
+# liquidatable flags in a bytearray. The aggregates and the other position columns are plain lists
+# of Python ints: RAY-scaled values and share amounts exceed 64 bits, and truncating them would
+# break the exactness above.
+#
+# Usage: python health_factor_engine.py [users] [reserves] [positionsPerUser] [ticks] [seed]
+import random
+import sys
+import time
+from array import array
+
+WAD = 10**18
+RAY = 10**27
+PERCENTAGE_FACTOR = 10**4
+VIRTUAL_SHARES = 10**6
+VIRTUAL_ASSETS = 10**6
+UINT256_MAX = 2**256 - 1
+HEALTH_FACTOR_LIQUIDATION_THRESHOLD = WAD
+
+
+def divUp(a, b):
+    return (a + b - 1) // b
+
+
+def previewRemoveByShares(shares, totalAddedAssets, addedShares):
+    return (
+        shares * (totalAddedAssets + VIRTUAL_ASSETS) // (addedShares + VIRTUAL_SHARES)
+    )
+
+
+def toValue(amount, decimals, price):
+    return amount * price * 10 ** (18 - decimals)
+
+
+def bpsToWad(a):
+    return a * (WAD // PERCENTAGE_FACTOR)
+
+
+def healthFactor(weightedCollateralValue, totalDebtValueRay):
+    if totalDebtValueRay == 0:
+        return UINT256_MAX
+    return bpsToWad(weightedCollateralValue) * RAY // totalDebtValueRay
+
+
+class Reserve:
+    def __init__(
+        self, decimals, price, drawnIndex, totalAddedAssets, addedShares, collateralRisk
+    ):
+        self.decimals = decimals
+        self.price = price
+        self.drawnIndex = drawnIndex
+        self.totalAddedAssets = totalAddedAssets
+        self.addedShares = addedShares
+        self.collateralRisk = collateralRisk
+
+    def collateralValue(self, suppliedShares):
+        return toValue(
+            previewRemoveByShares(
+                suppliedShares, self.totalAddedAssets, self.addedShares
+            ),
+            self.decimals,
+            self.price,
+        )
+
+    def debtValueRay(self, drawnShares, premiumShares, premiumOffsetRay):
+        premiumDebtRay = premiumShares * self.drawnIndex - premiumOffsetRay
+        return toValue(
+            drawnShares * self.drawnIndex + premiumDebtRay, self.decimals, self.price
+        )
+
+
+class Position:
+    """User position on a reserve.
+
+    collateralFactor is the user's dynamic config snapshot, 0 if not used as collateral.
+    """
+
+    def __init__(
+        self,
+        suppliedShares=0,
+        collateralFactor=0,
+        drawnShares=0,
+        premiumShares=0,
+        premiumOffsetRay=0,
+    ):
+        self.suppliedShares = suppliedShares
+        self.collateralFactor = collateralFactor
+        self.drawnShares = drawnShares
+        self.premiumShares = premiumShares
+        self.premiumOffsetRay = premiumOffsetRay
+
+
+def calculateUserAccountData(reserves, positions):
+    """From-scratch reference mirroring Spoke._processUserAccountData.
+
+    Returns (healthFactor, riskPremium).
+    """
+    totalCollateralValue = 0
+    weightedCollateralValue = 0
+    totalDebtValueRay = 0
+    collateralInfo = []
+    for reserveId in sorted(positions):
+        position = positions[reserveId]
+        reserve = reserves[reserveId]
+        if position.collateralFactor > 0 and position.suppliedShares > 0:
+            value = reserve.collateralValue(position.suppliedShares)
+            totalCollateralValue += value
+            weightedCollateralValue += position.collateralFactor * value
+            collateralInfo.append((reserve.collateralRisk, value))
+        if position.drawnShares > 0 or position.premiumShares > 0:
+            totalDebtValueRay += reserve.debtValueRay(
+                position.drawnShares, position.premiumShares, position.premiumOffsetRay
+            )
+
+    # sort by collateral risk in ASC, collateral value in DESC
+    collateralInfo.sort(key=lambda info: (info[0], -info[1]))
+    totalDebtValue = divUp(totalDebtValueRay, RAY)
+    debtValueLeftToCover = totalDebtValue
+    riskPremium = 0
+    for collateralRisk, value in collateralInfo:
+        if debtValueLeftToCover == 0:
+            break
+        value = min(value, debtValueLeftToCover)
+        riskPremium += value * collateralRisk
+        debtValueLeftToCover -= value
+    if debtValueLeftToCover < totalDebtValue:
+        riskPremium = divUp(riskPremium, totalDebtValue - debtValueLeftToCover)
+
+    return healthFactor(weightedCollateralValue, totalDebtValueRay), riskPremium
+
+
+class HealthFactorEngine:
+    """Incrementally maintained health factors for a population of users of a single Spoke."""
+
+    def __init__(self, reserves, userCount):
+        self.reserves = reserves
+        # per user aggregates
+        self.weightedCollateralValue = [0] * userCount
+        self.totalDebtValueRay = [0] * userCount
+        self.liquidatable = bytearray(userCount)
+        # per reserve inverted index (reserve -> users), with columnar position data
+        # and the cached contribution of each position to its user's aggregates
+        self.users = [array("q") for _ in reserves]
+        self.slot = [{} for _ in reserves]
+        self.suppliedShares = [[] for _ in reserves]
+        self.collateralFactor = [[] for _ in reserves]
+        self.drawnShares = [[] for _ in reserves]
+        self.premiumShares = [[] for _ in reserves]
+        self.premiumOffsetRay = [[] for _ in reserves]
+        self.collateralContribution = [[] for _ in reserves]
+        self.debtContribution = [[] for _ in reserves]
+
+    def healthFactor(self, user):
+        return healthFactor(
+            self.weightedCollateralValue[user], self.totalDebtValueRay[user]
+        )
+
+    def _collateralContribution(self, reserveId, i):
+        collateralFactor = self.collateralFactor[reserveId][i]
+        if collateralFactor == 0:
+            return 0
+        return collateralFactor * self.reserves[reserveId].collateralValue(
+            self.suppliedShares[reserveId][i]
+        )
+
+    def _debtContribution(self, reserveId, i):
+        return self.reserves[reserveId].debtValueRay(
+            self.drawnShares[reserveId][i],
+            self.premiumShares[reserveId][i],
+            self.premiumOffsetRay[reserveId][i],
+        )
+
+    def _refreshLiquidatable(self, user, crossings):
+        liquidatable = self.healthFactor(user) < HEALTH_FACTOR_LIQUIDATION_THRESHOLD
+        if liquidatable != self.liquidatable[user]:
+            self.liquidatable[user] = liquidatable
+            crossings.append((user, liquidatable))
+
+    def setPosition(self, user, reserveId, position):
+        """Inserts or replaces a user position (user action); returns the threshold crossings."""
+        slot = self.slot[reserveId]
+        if user not in slot:
+            slot[user] = len(self.users[reserveId])
+            self.users[reserveId].append(user)
+            for column in (
+                self.suppliedShares,
+                self.collateralFactor,
+                self.drawnShares,
+                self.premiumShares,
+                self.premiumOffsetRay,
+                self.collateralContribution,
+                self.debtContribution,
+            ):
+                column[reserveId].append(0)
+        i = slot[user]
+        self.suppliedShares[reserveId][i] = position.suppliedShares
+        self.collateralFactor[reserveId][i] = position.collateralFactor
+        self.drawnShares[reserveId][i] = position.drawnShares
+        self.premiumShares[reserveId][i] = position.premiumShares
+        self.premiumOffsetRay[reserveId][i] = position.premiumOffsetRay
+
+        collateral = self._collateralContribution(reserveId, i)
+        debt = self._debtContribution(reserveId, i)
+        self.weightedCollateralValue[user] += (
+            collateral - self.collateralContribution[reserveId][i]
+        )
+        self.totalDebtValueRay[user] += debt - self.debtContribution[reserveId][i]
+        self.collateralContribution[reserveId][i] = collateral
+        self.debtContribution[reserveId][i] = debt
+
+        crossings = []
+        self._refreshLiquidatable(user, crossings)
+        return crossings
+
+    def updateReserve(
+        self,
+        reserveId,
+        price=None,
+        drawnIndex=None,
+        totalAddedAssets=None,
+        addedShares=None,
+    ):
+        """Applies a reserve update, recomputing the affected users only.
+
+        Returns the liquidation threshold crossings as (user, liquidatable) pairs.
+        """
+        if price is not None and price <= 0:
+            # AaveOracle reverts with InvalidPrice
+            raise ValueError(f"invalid price {price} for reserve {reserveId}")
+        reserve = self.reserves[reserveId]
+        collateralChanged = (
+            price is not None or totalAddedAssets is not None or addedShares is not None
+        )
+        debtChanged = price is not None or drawnIndex is not None
+        if price is not None:
+            reserve.price = price
+        if drawnIndex is not None:
+            reserve.drawnIndex = drawnIndex
+        if totalAddedAssets is not None:
+            reserve.totalAddedAssets = totalAddedAssets
+        if addedShares is not None:
+            reserve.addedShares = addedShares
+
+        crossings = []
+        collateralContribution = self.collateralContribution[reserveId]
+        debtContribution = self.debtContribution[reserveId]
+        for i, user in enumerate(self.users[reserveId]):
+            if collateralChanged and self.collateralFactor[reserveId][i] > 0:
+                collateral = self._collateralContribution(reserveId, i)
+                self.weightedCollateralValue[user] += (
+                    collateral - collateralContribution[i]
+                )
+                collateralContribution[i] = collateral
+            if debtChanged and (
+                self.drawnShares[reserveId][i] > 0
+                or self.premiumShares[reserveId][i] > 0
+            ):
+                debt = self._debtContribution(reserveId, i)
+                self.totalDebtValueRay[user] += debt - debtContribution[i]
+                debtContribution[i] = debt
+            self._refreshLiquidatable(user, crossings)
+        return crossings
+
+
+def randomPopulation(rng, userCount, reserveCount, positionsPerUser):
+    reserves = []
+    for _ in range(reserveCount):
+        decimals = rng.choice([6, 8, 18])
+        addedShares = rng.randint(10**6, 10**12) * 10**decimals
+        reserves.append(
+            Reserve(
+                decimals=decimals,
+                price=rng.randint(10**6, 10**12),
+                drawnIndex=RAY + rng.randint(0, RAY),
+                totalAddedAssets=addedShares + rng.randint(0, addedShares),
+                addedShares=addedShares,
+                collateralRisk=rng.randint(0, 1000) * 10,
+            )
+        )
+    users = []
+    for _ in range(userCount):
+        positions = {}
+        for reserveId in rng.sample(range(reserveCount), positionsPerUser):
+            unit = 10 ** reserves[reserveId].decimals
+            if rng.random() < 0.5:
+                positions[reserveId] = Position(
+                    suppliedShares=rng.randint(1, 10**6) * unit,
+                    collateralFactor=rng.randint(5000, 9000),
+                )
+            else:
+                drawnShares = rng.randint(1, 10**5) * unit
+                premiumShares = drawnShares * rng.randint(0, 100) // 100
+                positions[reserveId] = Position(
+                    drawnShares=drawnShares,
+                    premiumShares=premiumShares,
+                    premiumOffsetRay=premiumShares * RAY,
+                )
+        users.append(positions)
+    return reserves, users
+
+
+def benchmark(userCount, reserveCount, positionsPerUser, ticks, seed):
+    rng = random.Random(seed)
+    reserves, users = randomPopulation(rng, userCount, reserveCount, positionsPerUser)
+
+    start = time.perf_counter()
+    engine = HealthFactorEngine(reserves, userCount)
+    for user, positions in enumerate(users):
+        for reserveId, position in positions.items():
+            engine.setPosition(user, reserveId, position)
+    print(
+        f"Indexed {userCount} users x {positionsPerUser} positions in {time.perf_counter() - start:.2f}s"
+    )
+
+    incrementalTime = 0
+    fullTime = 0
+    crossingCount = 0
+    for tick in range(ticks):
+        reserveId = rng.randrange(reserveCount)
+        reserve = reserves[reserveId]
+        if tick % 2 == 0:
+            # oracle price and debt accrual
+            update = dict(
+                price=reserve.price * rng.randint(90, 110) // 100,
+                drawnIndex=reserve.drawnIndex + rng.randint(0, RAY // 1000),
+            )
+        else:
+            # supply exchange rate: accrued interest and new supply at the current rate
+            addedShares = rng.randint(0, reserve.addedShares // 100)
+            update = dict(
+                totalAddedAssets=reserve.totalAddedAssets
+                + rng.randint(0, reserve.totalAddedAssets // 1000)
+                + addedShares * reserve.totalAddedAssets // reserve.addedShares,
+                addedShares=reserve.addedShares + addedShares,
+            )
+
+        start = time.perf_counter()
+        crossings = engine.updateReserve(reserveId, **update)
+        incrementalTime += time.perf_counter() - start
+        crossingCount += len(crossings)
+
+        start = time.perf_counter()
+        healthFactors = [
+            calculateUserAccountData(reserves, positions)[0] for positions in users
+        ]
+        fullTime += time.perf_counter() - start
+
+        assert healthFactors == [
+            engine.healthFactor(user) for user in range(userCount)
+        ], f"mismatch at tick {tick}"
+        liquidatable = [
+            hf < HEALTH_FACTOR_LIQUIDATION_THRESHOLD for hf in healthFactors
+        ]
+        assert liquidatable == [
+            bool(flag) for flag in engine.liquidatable
+        ], f"mismatch at tick {tick}"
+
+    print(f"{ticks} reserve updates, {crossingCount} liquidation threshold crossings")
+    print(
+        f"Incremental: {incrementalTime:.3f}s ({incrementalTime / ticks * 1000:.2f}ms per update)"
+    )
+    print(
+        f"Full recomputation: {fullTime:.3f}s ({fullTime / ticks * 1000:.2f}ms per update)"
+    )
+    print(f"Speedup: {fullTime / incrementalTime:.1f}x, health factors identical")
+
+
+if __name__ == "__main__":
+    userCount = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    reserveCount = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    positionsPerUser = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    ticks = int(sys.argv[4]) if len(sys.argv) > 4 else 50
+    seed = int(sys.argv[5]) if len(sys.argv) > 5 else 0
+    benchmark(userCount, reserveCount, positionsPerUser, ticks, seed)
@@ -0,0 +1,334 @@
+# Simulates Hub/Spoke premium accounting over long random streams of user updates and measures how
+# the Hub's aggregate premium drifts from the sum of its users' premiums.
+#
+# Updates use the exact integer math of Premium.calculatePremiumRay, UserPositionDebt's
+# calculatePremiumDelta and calculateRestoreAmount, and Hub._validateApplyPremiumDelta. Premium debt
+# is kept with RAY precision and is linear in (premiumShares, premiumOffsetRay), so the aggregate
+# premiumRay must equal the sum of the users' premiumRay exactly (and the Hub's premium change check
+# must hold for every batch), which is asserted along the way.
+# Drift only appears where RAY amounts are rounded up to asset units: the Hub reports
+# fromRayUp(Σ premiumRay) while each user owes fromRayUp(premiumRay), and a restore charges
+# fromRayUp(restoredPremiumRay) for restoredPremiumRay of premium. Both are tracked per market.
+#
+# Updates are applied in batches touching distinct users at a fixed drawnIndex (the index accrues
+# between batches). That keeps the state columnar, so the Hub deltas of a batch and the
+# population-wide drift are computed with builtin map/sum loops over int lists, and independent
+# markets are simulated in parallel processes.
+#
+# Usage: python premium_drift.py [markets] [users] [updatesPerMarket] [batchSize] [processes] [seed]
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from operator import add, floordiv, mul, neg, sub
+
+RAY = 10**27
+PERCENTAGE_FACTOR = 10**4
+MAX_RISK_PREMIUM = 1000_00
+MAX_DRAWN_SHARES = 10**30
+# drawnIndex growth per batch is at most 0.1%
+MAX_INDEX_GROWTH = RAY // 1000
+
+RISK_PREMIUMS = range(MAX_RISK_PREMIUM + 1)
+SHARES_BITS = range(1, MAX_DRAWN_SHARES.bit_length())
+
+
+def fromRayUp(a):
+    return -(-a // RAY)
+
+
+def rayMulUp(a, b):
+    return -(-a * b // RAY)
+
+
+def rayDivDown(a, b):
+    return a * RAY // b
+
+
+def percentMulUp(value, percentage):
+    return -(-value * percentage // PERCENTAGE_FACTOR)
+
+
+def calculatePremiumRay(premiumShares, premiumOffsetRay, drawnIndex):
+    premiumRay = premiumShares * drawnIndex - premiumOffsetRay
+    assert premiumRay >= 0, "calculatePremiumRay reverts"
+    return premiumRay
+
+
+def calculatePremiumDelta(
+    drawnShares,
+    premiumShares,
+    premiumOffsetRay,
+    drawnSharesTaken,
+    drawnIndex,
+    riskPremium,
+    restoredPremiumRay,
+):
+    """UserPositionDebt.calculatePremiumDelta: (sharesDelta, offsetRayDelta, restoredPremiumRay)"""
+    premiumDebtRay = calculatePremiumRay(premiumShares, premiumOffsetRay, drawnIndex)
+    newPremiumShares = percentMulUp(drawnShares - drawnSharesTaken, riskPremium)
+    newPremiumOffsetRay = newPremiumShares * drawnIndex - (premiumDebtRay - restoredPremiumRay)
+    return (
+        newPremiumShares - premiumShares,
+        newPremiumOffsetRay - premiumOffsetRay,
+        restoredPremiumRay,
+    )
+
+
+def calculateRestoreAmount(drawnShares, premiumShares, premiumOffsetRay, drawnIndex, amount):
+    """UserPositionDebt.calculateRestoreAmount: (drawnDebtRestored, premiumDebtRayRestored)"""
+    drawnDebt = rayMulUp(drawnShares, drawnIndex)
+    premiumDebtRay = calculatePremiumRay(premiumShares, premiumOffsetRay, drawnIndex)
+    premiumDebt = fromRayUp(premiumDebtRay)
+    if amount >= drawnDebt + premiumDebt:
+        return drawnDebt, premiumDebtRay
+    if amount < premiumDebt:
+        return 0, amount * RAY
+    return amount - premiumDebt, premiumDebtRay
+
+
+def _ceilDiv(values, divisor):
+    return map(neg, map(floordiv, map(neg, values), repeat(divisor)))
+
+
+def calculateRestoreAmounts(drawnDebt, premiumDebtRay, amounts):
+    """calculateRestoreAmount over a batch: (drawnDebtRestored, premiumDebtRayRestored) pairs."""
+    return [
+        (
+            (debt, premiumRay)
+            if amount >= debt + premium
+            else (0, amount * RAY) if amount < premium else (amount - premium, premiumRay)
+        )
+        for debt, premiumRay, premium, amount in zip(
+            drawnDebt, premiumDebtRay, _ceilDiv(premiumDebtRay, RAY), amounts
+        )
+    ]
+
+
+class Market:
+    """A Hub asset with a single Spoke, holding the Spoke's user positions as int columns."""
+
+    def __init__(self, drawnIndex, drawnShares, riskPremium):
+        self.drawnIndex = drawnIndex
+        self.drawnShares = drawnShares
+        self.riskPremium = riskPremium
+        self.premiumShares = list(map(percentMulUp, drawnShares, riskPremium))
+        self.premiumOffsetRay = [shares * drawnIndex for shares in self.premiumShares]
+        self.assetPremiumShares = sum(self.premiumShares)
+        self.assetPremiumOffsetRay = sum(self.premiumOffsetRay)
+
+    def assetPremiumRay(self):
+        return calculatePremiumRay(
+            self.assetPremiumShares, self.assetPremiumOffsetRay, self.drawnIndex
+        )
+
+    def premiumDebtRay(self, users):
+        return list(
+            map(
+                sub,
+                map(mul, map(self.premiumShares.__getitem__, users), repeat(self.drawnIndex)),
+                map(self.premiumOffsetRay.__getitem__, users),
+            )
+        )
+
+    def drawnDebt(self, users):
+        return list(
+            _ceilDiv(
+                map(mul, map(self.drawnShares.__getitem__, users), repeat(self.drawnIndex)), RAY
+            )
+        )
+
+    def applyPremiumDeltas(self, users, premiumDebtRay, drawnSharesTaken, restoredPremiumRay):
+        """calculatePremiumDelta followed by applyPremiumDelta on the user positions and the Hub
+        asset, over a batch of distinct users."""
+        oldShares = list(map(self.premiumShares.__getitem__, users))
+        oldOffsets = list(map(self.premiumOffsetRay.__getitem__, users))
+        drawnShares = list(map(sub, map(self.drawnShares.__getitem__, users), drawnSharesTaken))
+        newShares = list(
+            _ceilDiv(
+                map(mul, drawnShares, map(self.riskPremium.__getitem__, users)),
+                PERCENTAGE_FACTOR,
+            )
+        )
+        newOffsets = list(
+            map(
+                sub,
+                map(mul, newShares, repeat(self.drawnIndex)),
+                map(sub, premiumDebtRay, restoredPremiumRay),
+            )
+        )
+        for user, drawn, shares, offset in zip(users, drawnShares, newShares, newOffsets):
+            self.drawnShares[user] = drawn
+            self.premiumShares[user] = shares
+            self.premiumOffsetRay[user] = offset
+        self.assetPremiumShares += sum(newShares) - sum(oldShares)
+        self.assetPremiumOffsetRay += sum(newOffsets) - sum(oldOffsets)
+
+    def premiumDrift(self):
+        """Σ fromRayUp(user premiumRay) - fromRayUp(asset premiumRay), in asset units."""
+        premiumDebtRay = map(
+            sub, map(mul, self.premiumShares, repeat(self.drawnIndex)), self.premiumOffsetRay
+        )
+        usersPremium = sum(_ceilDiv(premiumDebtRay, RAY))
+        return usersPremium - fromRayUp(self.assetPremiumRay())
+
+
+def referenceUpdate(market, user, amount):
+    """The user's (drawnShares, premiumShares, premiumOffsetRay) after a premium refresh, or after
+    repaying amount, computed one user at a time with the Solidity mirrors above."""
+    drawnIndex = market.drawnIndex
+    drawn = market.drawnShares[user]
+    shares, offset = market.premiumShares[user], market.premiumOffsetRay[user]
+    drawnRestored, restoredRay = (
+        (0, 0)
+        if amount is None
+        else calculateRestoreAmount(drawn, shares, offset, drawnIndex, amount)
+    )
+    drawnSharesTaken = rayDivDown(drawnRestored, drawnIndex)
+    sharesDelta, offsetRayDelta, _ = calculatePremiumDelta(
+        drawn, shares, offset, drawnSharesTaken, drawnIndex, market.riskPremium[user], restoredRay
+    )
+    return drawn - drawnSharesTaken, shares + sharesDelta, offset + offsetRayDelta
+
+
+def randomShares(rng, count):
+    """Log-uniformly distributed share amounts below MAX_DRAWN_SHARES."""
+    return list(map(rng.getrandbits, rng.choices(SHARES_BITS, k=count)))
+
+
+def simulateMarket(parameters):
+    seed, userCount, updateCount, batchSize = parameters
+    rng = random.Random(seed)
+    market = Market(
+        RAY + rng.randrange(MAX_INDEX_GROWTH * 100),
+        randomShares(rng, userCount),
+        rng.choices(RISK_PREMIUMS, k=userCount),
+    )
+
+    updates = 0
+    restoredPremiumRay = 0
+    restoredPremium = 0
+    trajectory = []
+    users = range(userCount)
+    while updates < updateCount:
+        # distinct users, split at random into riskPremium refreshes, borrows and repays
+        batch = list(dict.fromkeys(rng.choices(users, k=min(batchSize, updateCount - updates))))
+        borrowStart, repayStart = sorted(rng.choices(range(len(batch) + 1), k=2))
+        for user, riskPremium in zip(
+            batch[:borrowStart], rng.choices(RISK_PREMIUMS, k=borrowStart)
+        ):
+            market.riskPremium[user] = riskPremium
+        for user, shares in zip(
+            batch[borrowStart:repayStart], randomShares(rng, repayStart - borrowStart)
+        ):
+            market.drawnShares[user] += shares
+
+        premiumDebtRay = market.premiumDebtRay(batch)
+        drawnDebt = market.drawnDebt(batch[repayStart:])
+        totalDebt = map(add, drawnDebt, _ceilDiv(premiumDebtRay[repayStart:], RAY))
+        amounts = list(map(rng.getrandbits, map(int.bit_length, totalDebt)))
+        restored = calculateRestoreAmounts(drawnDebt, premiumDebtRay[repayStart:], amounts)
+        drawnSharesTaken = [0] * repayStart + [
+            rayDivDown(drawnRestored, market.drawnIndex) for drawnRestored, _ in restored
+        ]
+        restoredRay = [0] * repayStart + [premiumRay for _, premiumRay in restored]
+
+        # the first refreshed and the first repaying user are checked against the reference
+        expected = {
+            batch[i]: referenceUpdate(market, batch[i], amounts[0] if i == repayStart else None)
+            for i in {0, repayStart}
+            if i < len(batch)
+        }
+        assetPremiumRayBefore = market.assetPremiumRay()
+        market.applyPremiumDeltas(batch, premiumDebtRay, drawnSharesTaken, restoredRay)
+        batchRestoredPremiumRay = sum(restoredRay)
+        # Hub._validateApplyPremiumDelta, summed over the batch
+        assert market.assetPremiumRay() + batchRestoredPremiumRay == assetPremiumRayBefore
+        for user, position in expected.items():
+            assert position == (
+                market.drawnShares[user],
+                market.premiumShares[user],
+                market.premiumOffsetRay[user],
+            )
+
+        restoredPremiumRay += batchRestoredPremiumRay
+        restoredPremium += sum(_ceilDiv(restoredRay[repayStart:], RAY))
+        updates += len(batch)
+
+        market.drawnIndex = rayMulUp(market.drawnIndex, RAY + rng.randrange(MAX_INDEX_GROWTH + 1))
+        drift = market.premiumDrift()
+        assert 0 <= drift < userCount
+        trajectory.append((updates, market.drawnIndex, drift))
+
+    assert market.assetPremiumShares == sum(market.premiumShares)
+    assert market.assetPremiumOffsetRay == sum(market.premiumOffsetRay)
+    return {
+        "seed": seed,
+        "trajectory": trajectory,
+        # premium charged on restores beyond the premium debt it removed, in asset units
+        "restoreSurplus": fromRayUp(restoredPremium * RAY - restoredPremiumRay),
+    }
+
+
+def histogram(values, width):
+    buckets = {}
+    for value in values:
+        buckets[value // width] = buckets.get(value // width, 0) + 1
+    return sorted(buckets.items())
+
+
+def simulate(markets, userCount, updatesPerMarket, batchSize, processes, seed):
+    parameters = [(seed + m, userCount, updatesPerMarket, batchSize) for m in range(markets)]
+    start = time.perf_counter()
+    if processes == 1:
+        results = list(map(simulateMarket, parameters))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(simulateMarket, parameters))
+    elapsed = time.perf_counter() - start
+
+    updates = markets * updatesPerMarket
+    print(
+        f"{updates:,} premium updates over {markets} markets x {userCount:,} users "
+        f"in {elapsed:.2f}s ({updates / elapsed:,.0f} updates/s)"
+    )
+    print("✅ Aggregate premiumRay equals the sum of user premiumRay, with no drift in RAY units.")
+
+    drifts = [drift for result in results for _, _, drift in result["trajectory"]]
+    print(
+        f"Premium drift Σ fromRayUp(user) - fromRayUp(Σ user), in wei, "
+        f"over {len(drifts):,} checkpoints (bound: 0 <= drift < users):"
+    )
+    width = -(-userCount // 20)
+    for bucket, count in histogram(drifts, width):
+        bar = "#" * max(1, round(50 * count / len(drifts)))
+        print(f"  {bucket * width:>9,}-{(bucket + 1) * width - 1:<9,} {count:>9,} {bar}")
+
+    surpluses = [result["restoreSurplus"] for result in results]
+    print(
+        f"Restore surplus (fromRayUp(restoredPremiumRay) - restoredPremiumRay): "
+        f"max {max(surpluses):,} wei per market, {sum(surpluses):,} wei in total"
+    )
+
+    worst = max(results, key=lambda result: max(drift for _, _, drift in result["trajectory"]))
+    trajectory = worst["trajectory"]
+    peak = max(range(len(trajectory)), key=lambda i: trajectory[i][2])
+    print(
+        f"Worst trajectory (seed {worst['seed']}): drift peaks at {trajectory[peak][2]:,} wei "
+        f"after {trajectory[peak][0]:,} updates"
+    )
+    step = max(1, len(trajectory) // 10)
+    for updatesSoFar, drawnIndex, drift in trajectory[-1::-step][::-1]:
+        print(f"  {updatesSoFar:>12,} updates  drawnIndex {drawnIndex / RAY:.6f}  drift {drift:,}")
+
+
+if __name__ == "__main__":
+    markets = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    userCount = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    updatesPerMarket = int(sys.argv[3]) if len(sys.argv) > 3 else 200_000
+    batchSize = int(sys.argv[4]) if len(sys.argv) > 4 else 1_000
+    processes = int(sys.argv[5]) if len(sys.argv) > 5 else os.cpu_count()
+    seed = int(sys.argv[6]) if len(sys.argv) > 6 else 0
+    simulate(markets, userCount, updatesPerMarket, batchSize, processes, seed)
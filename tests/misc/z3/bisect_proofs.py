@@ -0,0 +1,258 @@
+# Finds the first commit where proving a property became more expensive.
+#
+# Each revision of the range is checked out (only this directory) into its own git worktree and the
+# proof script is run there under a fixed rlimit budget, so costs are comparable across machines
+# and runs. z3's Solver.check is instrumented from the outside, which also works on revisions
+# that predate commons.check(). The range is multisected: every round measures up to --workers
+# revisions in parallel and keeps the segment holding the first revision whose cost exceeds
+# --threshold times the cost at the good revision. Revisions where the script fails or the
+# property does not exist are skipped. Checks get the budgets run_proofs.py would give them
+# (including its RLIMIT_OVERRIDES), and every worktree starts from this directory's lemma cache,
+# so lemmas already proven are skipped there just as they are by run_proofs.py. The culprit is reported with its z3 statistics next to
+# those of its predecessor.
+#
+# Usage: python bisect_proofs.py [--rlimit N] [--threshold F] [--workers N] script property good [bad]
+#   python bisect_proofs.py tokenization_spoke_max.py "maxRedeem())) <= balance" HEAD~20
+import argparse
+import json
+import os
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from run_proofs import DEFAULT_RLIMIT, DIRECTORY, rlimitBudgets
+
+LEMMA_CACHE = ".lemma_cache.json"
+
+# z3 statistics that accumulate over the lifetime of a solver instead of describing one check
+CUMULATIVE_STATISTICS = {"rlimit count", "num allocs"}
+MAXIMUM_STATISTICS = {"max memory", "memory"}
+
+
+def git(*args, cwd=DIRECTORY):
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def measureScript(script, rlimit, statsPath):
+    """Runs script in the current directory, recording every Solver.check made by it."""
+    sys.path.insert(0, os.getcwd())
+    import z3
+    import commons
+
+    rlimits = json.loads(os.environ.get("Z3_RLIMITS", "{}"))
+    records = []
+    label = [None]
+    solverCheck = z3.Solver.check
+
+    def recordedCheck(self, *assumptions):
+        self.set("rlimit", rlimits.get(label[0], rlimit))
+        before = self.statistics()
+        cumulative = {k: before.get_key_value(k) for k in before.keys()}
+        result = solverCheck(self, *assumptions)
+        after = self.statistics()
+        statistics = {k: after.get_key_value(k) for k in after.keys()}
+        for key in CUMULATIVE_STATISTICS & statistics.keys():
+            statistics[key] -= cumulative.get(key, 0)
+        description = label[0] or f"check {len(records) + 1}"
+        records.append({"property": description, "result": str(result), "statistics": statistics})
+        return result
+
+    def labelled(f):
+        def wrapper(s, propertyDescription, *args, **kwargs):
+            label[0] = propertyDescription
+            return f(s, propertyDescription, *args, **kwargs)
+
+        return wrapper
+
+    z3.Solver.check = recordedCheck
+    for name in ("check", "proveValid", "proveSatisfiable"):
+        if hasattr(commons, name):
+            setattr(commons, name, labelled(getattr(commons, name)))
+    try:
+        runpy.run_path(script, run_name="__main__")
+    finally:
+        with open(statsPath, "w") as f:
+            json.dump(records, f)
+
+
+class Bisection:
+    def __init__(self, script, property, rlimit, rlimits, workers):
+        self.script = script
+        self.property = property
+        self.rlimit = rlimit
+        self.rlimits = rlimits
+        self.workers = workers
+        self.root = git("rev-parse", "--show-toplevel")
+        self.directory = os.path.relpath(DIRECTORY, self.root)
+        self.temporaryDirectory = tempfile.mkdtemp(prefix="bisect-proofs-")
+        self.measurements = {}
+        # git serializes worktree bookkeeping through lock files
+        self.worktreeLock = threading.Lock()
+
+    def measure(self, revision):
+        worktree = os.path.join(self.temporaryDirectory, revision)
+        statsPath = f"{worktree}.json"
+        with self.worktreeLock:
+            git("worktree", "add", "--detach", "--no-checkout", worktree, revision)
+        try:
+            try:
+                git("checkout", revision, "--", self.directory, cwd=worktree)
+            except subprocess.CalledProcessError:
+                # the directory does not exist at this revision
+                return None
+            cache = os.path.join(DIRECTORY, LEMMA_CACHE)
+            if os.path.exists(cache):
+                shutil.copy(cache, os.path.join(worktree, self.directory, LEMMA_CACHE))
+            completed = subprocess.run(
+                [
+                    sys.executable,
+                    os.path.abspath(__file__),
+                    "--measure",
+                    "--rlimit",
+                    str(self.rlimit),
+                    "--stats",
+                    statsPath,
+                    self.script,
+                ],
+                cwd=os.path.join(worktree, self.directory),
+                env=dict(
+                    os.environ,
+                    Z3_RLIMIT=str(self.rlimit),
+                    Z3_RLIMITS=json.dumps(self.rlimits),
+                    Z3_STATS_FILE="",
+                ),
+                capture_output=True,
+                text=True,
+            )
+            records = []
+            if os.path.exists(statsPath):
+                with open(statsPath) as f:
+                    records = [r for r in json.load(f) if self.property in r["property"]]
+        finally:
+            with self.worktreeLock:
+                git("worktree", "remove", "--force", worktree, cwd=self.root)
+        if completed.returncode != 0 or not records:
+            return None
+        return records
+
+    def measureAll(self, revisions):
+        revisions = [r for r in revisions if r not in self.measurements]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for revision, records in zip(revisions, pool.map(self.measure, revisions)):
+                self.measurements[revision] = records
+                print(f"  {revision[:10]} {describeCost(records)}", flush=True)
+
+    def close(self):
+        shutil.rmtree(self.temporaryDirectory, ignore_errors=True)
+        git("worktree", "prune", cwd=self.root)
+
+
+def cost(records):
+    return sum(r["statistics"].get("rlimit count", 0) for r in records)
+
+
+def describeCost(records):
+    if records is None:
+        return "skipped (script failed or property not found)"
+    results = ", ".join(sorted({r["result"] for r in records}))
+    return f"{cost(records):,} rlimit ({results})"
+
+
+def combinedStatistics(records):
+    combined = {}
+    for record in records:
+        for key, value in record["statistics"].items():
+            if key in MAXIMUM_STATISTICS:
+                combined[key] = max(combined.get(key, 0), value)
+            else:
+                combined[key] = combined.get(key, 0) + value
+    return combined
+
+
+def printComparison(before, after):
+    for label, records in (("before", before), ("after", after)):
+        for record in records:
+            print(f"  {label}: {record['result']} {record['property']}")
+    before, after = combinedStatistics(before), combinedStatistics(after)
+    print(f"  {'z3 statistic':32} {'before':>14} {'after':>14}")
+    for key in sorted(before.keys() | after.keys()):
+        print(f"  {key:32} {before.get(key, '-'):>14} {after.get(key, '-'):>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("script")
+    parser.add_argument("property", nargs="?", help="substring of the property description")
+    parser.add_argument("good", nargs="?", help="revision where the property is cheap")
+    parser.add_argument("bad", nargs="?", default="HEAD")
+    parser.add_argument(
+        "--rlimit", type=int, help="per check (defaults to the budget run_proofs.py uses)"
+    )
+    parser.add_argument("--threshold", type=float, default=1.5, help="relative to good")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--stats", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    rlimit, rlimits = rlimitBudgets(args.script, DEFAULT_RLIMIT)
+    rlimit = args.rlimit or rlimit
+    if args.measure:
+        measureScript(args.script, rlimit, args.stats)
+        return
+    if args.good is None:
+        parser.error("property and good revision are required")
+
+    good, bad = git("rev-parse", args.good), git("rev-parse", args.bad)
+    revisions = [good] + git("rev-list", "--reverse", "--ancestry-path", f"{good}..{bad}").split()
+    print(f"Bisecting {len(revisions)} revisions with a {rlimit:,} rlimit budget per check")
+
+    bisection = Bisection(args.script, args.property, rlimit, rlimits, args.workers)
+    try:
+        bisection.measureAll([good, bad])
+        measurements = bisection.measurements
+        if measurements[good] is None or measurements[bad] is None:
+            sys.exit("The property must be measurable at both ends of the range")
+        limit = args.threshold * cost(measurements[good])
+        if cost(measurements[bad]) <= limit:
+            print(f"No regression: {cost(measurements[bad]):,} <= {limit:,.0f} rlimit")
+            return
+
+        low, high = 0, len(revisions) - 1
+        while True:
+            unmeasured = [i for i in range(low + 1, high) if revisions[i] not in measurements]
+            if not unmeasured:
+                break
+            step = len(unmeasured) / (args.workers + 1)
+            probes = sorted({unmeasured[int(step * (k + 1))] for k in range(args.workers)})
+            bisection.measureAll([revisions[i] for i in probes])
+            for i in range(low + 1, high):
+                records = measurements.get(revisions[i])
+                if records is not None and cost(records) > limit:
+                    high = i
+                    break
+            for i in range(high - 1, low, -1):
+                records = measurements.get(revisions[i])
+                if records is not None:
+                    low = i
+                    break
+    finally:
+        bisection.close()
+
+    culprit, previous = revisions[high], revisions[low]
+    print()
+    print(f"First revision costing more than {limit:,.0f} rlimit (threshold {args.threshold}x):")
+    print(f"  {git('log', '-1', '--format=%h %s', culprit)}")
+    if high - low > 1:
+        print(f"  ({high - low - 1} skipped revisions before it could also be responsible)")
+    print(f"Compared with {git('log', '-1', '--format=%h %s', previous)}:")
+    printComparison(measurements[previous], measurements[culprit])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,19 @@
+import json
+import os
+
 from z3 import *
 
+# Set by run_proofs.py: deterministic resource budget per check (instead of wall-clock
+# timeouts), z3 memory cap in MB, and a JSON lines file collecting the cost of every check.
+RLIMIT = int(os.environ.get("Z3_RLIMIT", 0))
+# per check overrides of RLIMIT, a JSON object {property description: rlimit}
+RLIMITS = json.loads(os.environ.get("Z3_RLIMITS", "{}"))
+MEMORY_MAX_MB = int(os.environ.get("Z3_MEMORY_MAX_MB", 0))
+STATS_FILE = os.environ.get("Z3_STATS_FILE")
+
+if MEMORY_MAX_MB:
+    set_param("memory_max_size", MEMORY_MAX_MB)
+
 WAD = IntVal(10**18)
 RAY = IntVal(10**27)
 PERCENTAGE_FACTOR = IntVal(10**4)
@@ -53,6 +67,10 @@ def fromRayUp(a):
 def toRay(a):
     return a * RAY
 
+
+def percentMulDown(a, b):
+    return (a * b) / PERCENTAGE_FACTOR
+
 def min(a, b):
     return If(a <= b, a, b)
 
@@ -104,12 +122,44 @@ def toValue(amount, decimals, price):
     return amount * (10 ** (18 - decimals)) * price
 
 
+def _statistic(statistics, key):
+    return statistics.get_key_value(key) if key in statistics.keys() else 0
+
+
+# Result each kind of check is expected to return; "induction" checks are informative only.
+EXPECTED_RESULTS = {"valid": unsat, "satisfiable": sat, "induction": None}
+
+
+def check(s, propertyDescription, kind, *assumptions, expected=None):
+    """s.check(*assumptions) under the configured rlimit budget, recording the check's cost."""
+    if expected is None:
+        expected = EXPECTED_RESULTS[kind]
+    rlimit = RLIMITS.get(propertyDescription, RLIMIT)
+    if rlimit:
+        s.set("rlimit", rlimit)
+    rlimitBefore = _statistic(s.statistics(), "rlimit count")
+    result = s.check(*assumptions)
+    if STATS_FILE:
+        statistics = s.statistics()
+        with open(STATS_FILE, "a") as f:
+            record = {
+                "property": propertyDescription,
+                "kind": kind,
+                "expected": None if expected is None else str(expected),
+                "result": str(result),
+                "rlimit": _statistic(statistics, "rlimit count") - rlimitBefore,
+                "memory": _statistic(statistics, "max memory"),
+            }
+            f.write(json.dumps(record) + "\n")
+    return result
+
+
 def proveValid(s, propertyDescription, property, assumptions=[], variables=[]):
     propertyDescriptionOutput = f"-- VALID Property: {propertyDescription} --"
     print("=" * len(propertyDescriptionOutput))
     print(propertyDescriptionOutput)
 
-    result = s.check(Not(property), *assumptions)
+    result = check(s, propertyDescription, "valid", Not(property), *assumptions)
     if result == sat:
         print("❌ Property is not valid:")
         print(s.model())
@@ -121,23 +171,30 @@ def proveValid(s, propertyDescription, property, assumptions=[], variables=[]):
         print("❓ Timed out or unknown.")
 
     print("=" * len(propertyDescriptionOutput))
+    return result
 
 
-def proveSatisfiable(s, propertyDescription, property, assumptions=[], variables=[]):
+def proveSatisfiable(
+    s, propertyDescription, property, assumptions=[], variables=[], expected=sat
+):
+    """Asks whether property can hold. Pass expected=unsat when the answer we want is "never"."""
     propertyDescriptionOutput = f"-- SATISFIABLE Property: {propertyDescription} --"
     print("=" * len(propertyDescriptionOutput))
     print(propertyDescriptionOutput)
 
-    result = s.check(property, *assumptions)
+    result = check(
+        s, propertyDescription, "satisfiable", property, *assumptions, expected=expected
+    )
     if result == sat:
-        print("✅ Property is satisfiable")
+        print(f"{'✅' if expected == sat else '❌'} Property is satisfiable")
         m = s.model()
         print(m)
         for variable, variableName in variables:
             print(f"{variableName}: {m.eval(variable)}")
     elif result == unsat:
-        print("❌ Property is unsatisfiable.")
+        print(f"{'✅' if expected == unsat else '❌'} Property is unsatisfiable.")
     elif result == unknown:
         print("❓ Timed out or unknown.")
 
     print("=" * len(propertyDescriptionOutput))
+    return result
@@ -0,0 +1,529 @@
+# Bounded model checking and k-induction over sequences of Hub operations on a single asset.
+#
+# The asset state is encoded once per step and consecutive states are linked by a symbolic
+# step relation that picks one of add/remove/draw/restore/reportDeficit/eliminateDeficit/
+# mintFeeShares/accrue. Every operation other than accrue assumes the asset was already
+# accrued in the same block (the stored drawnIndex is current, so there are no unrealized
+# fees); accrual is its own step, which recovers the T1/T2/T3 timeline of
+# supply_share_price_fees.py as a special case.
+#
+# The base case and the inductive step each unroll incrementally on a single solver: a deeper
+# step only adds the new transition (and the properties already proven for the previous one)
+# to the existing solver state. At depth k the inductive step assumes each property on the k - 1
+# earlier transitions of an arbitrary valid start state and checks it on the last one; a
+# counterexample there only means the property is not k-inductive. A property proven k-inductive
+# is only assumed while checking the others once the base case holds up to depth k as well.
+#
+# Usage: python hub_transition_system.py [maxDepth] [timeoutMs]
+# (the timeout is ignored when run_proofs.py sets a deterministic rlimit budget)
+import sys
+
+from commons import *
+
+ADD = 0
+REMOVE = 1
+DRAW = 2
+RESTORE = 3
+REPORT_DEFICIT = 4
+ELIMINATE_DEFICIT = 5
+MINT_FEE_SHARES = 6
+ACCRUE = 7
+
+OPERATION_NAMES = [
+    "add",
+    "remove",
+    "draw",
+    "restore",
+    "reportDeficit",
+    "eliminateDeficit",
+    "mintFeeShares",
+    "accrue",
+]
+
+STATE_FIELDS = [
+    "liquidity",
+    "swept",
+    "addedShares",
+    "drawnShares",
+    "premiumShares",
+    "premiumOffsetRay",
+    "deficitRay",
+    "realizedFees",
+    "drawnIndex",
+    "liquidityFee",
+]
+
+
+class AssetState:
+    """Symbolic Hub asset state at a given step."""
+
+    def __init__(self, step):
+        self.step = step
+        for field in STATE_FIELDS:
+            setattr(self, field, Int(f"{field}_{step}"))
+
+    def premiumRay(self, drawnIndex=None):
+        drawnIndex = self.drawnIndex if drawnIndex is None else drawnIndex
+        return self.premiumShares * drawnIndex - self.premiumOffsetRay
+
+    def aggregatedOwedRay(self, drawnIndex=None):
+        drawnIndex = self.drawnIndex if drawnIndex is None else drawnIndex
+        return (
+            self.drawnShares * drawnIndex
+            + self.premiumRay(drawnIndex)
+            + self.deficitRay
+        )
+
+    def totalAddedAssets(self):
+        return Int(f"totalAddedAssets_{self.step}")
+
+    def definitions(self):
+        return self.totalAddedAssets() == (
+            self.liquidity
+            + self.swept
+            + fromRayUp(self.aggregatedOwedRay())
+            - self.realizedFees
+        )
+
+
+def initialState(s):
+    """Freshly listed asset."""
+    return And(
+        s.definitions(),
+        s.liquidity == 0,
+        s.swept == 0,
+        s.addedShares == 0,
+        s.drawnShares == 0,
+        s.premiumShares == 0,
+        s.premiumOffsetRay == 0,
+        s.deficitRay == 0,
+        s.realizedFees == 0,
+        s.drawnIndex == RAY,
+        0 <= s.liquidityFee,
+        s.liquidityFee <= PERCENTAGE_FACTOR,
+    )
+
+
+def validState(s):
+    """Range constraints implied by the storage types and the protocol limits."""
+    return And(
+        0 <= s.liquidity,
+        s.liquidity <= MAX_SUPPLY_AMOUNT,
+        0 <= s.swept,
+        s.swept <= MAX_SUPPLY_AMOUNT,
+        0 <= s.addedShares,
+        s.addedShares <= MAX_SUPPLY_AMOUNT,
+        0 <= s.drawnShares,
+        s.drawnShares <= MAX_SUPPLY_AMOUNT,
+        0 <= s.premiumShares,
+        s.premiumShares <= MAX_SUPPLY_AMOUNT,
+        0 <= s.premiumRay(),
+        s.premiumRay() <= toRay(MAX_SUPPLY_AMOUNT),
+        0 <= s.deficitRay,
+        s.deficitRay <= toRay(MAX_SUPPLY_AMOUNT),
+        0 <= s.realizedFees,
+        s.realizedFees <= MAX_SUPPLY_AMOUNT,
+        MIN_DRAWN_INDEX <= s.drawnIndex,
+        s.drawnIndex <= MAX_DRAWN_INDEX,
+        0 <= s.liquidityFee,
+        s.liquidityFee <= PERCENTAGE_FACTOR,
+        s.definitions(),
+        s.totalAddedAssets() >= 0,
+    )
+
+
+def mulDivDefinition(result, a, num, den, roundUp):
+    """Division-free definition of result == mulDiv(a, num, den), for den > 0."""
+    if roundUp:
+        return And(result * den >= a * num, (result - 1) * den < a * num)
+    return And(result * den <= a * num, (result + 1) * den > a * num)
+
+
+def addedSharesDefinition(shares, assets, s, roundUp):
+    return mulDivDefinition(
+        shares,
+        assets,
+        s.addedShares + VIRTUAL_SHARES,
+        s.totalAddedAssets() + VIRTUAL_ASSETS,
+        roundUp,
+    )
+
+
+def assetsOut(s):
+    """Assets paid out (removed liquidity or eliminated deficit) by the step leaving s."""
+    return Int(f"assetsOut_{s.step}")
+
+
+def unchanged(s, t, *fields):
+    return And([getattr(s, field) == getattr(t, field) for field in fields])
+
+
+def unchangedExcept(s, t, *fields):
+    return unchanged(s, t, *[field for field in STATE_FIELDS if field not in fields])
+
+
+def applyPremiumDelta(s, t, k, restoredPremiumRay):
+    """_applyPremiumDelta: premium owed decreases by exactly restoredPremiumRay."""
+    sharesDelta = Int(f"premiumSharesDelta_{k}")
+    offsetRayDelta = Int(f"premiumOffsetRayDelta_{k}")
+    return And(
+        t.premiumShares == s.premiumShares + sharesDelta,
+        t.premiumOffsetRay == s.premiumOffsetRay + offsetRayDelta,
+        t.premiumRay(s.drawnIndex) + restoredPremiumRay == s.premiumRay(),
+    )
+
+
+def addStep(s, t, k):
+    amount = Int(f"addAmount_{k}")
+    shares = Int(f"addShares_{k}")
+    return And(
+        amount > 0,
+        addedSharesDefinition(shares, amount, s, roundUp=False),
+        shares > 0,
+        t.addedShares == s.addedShares + shares,
+        t.liquidity == s.liquidity + amount,
+        unchangedExcept(s, t, "addedShares", "liquidity"),
+    )
+
+
+def removeStep(s, t, k):
+    amount = Int(f"removeAmount_{k}")
+    shares = Int(f"removeShares_{k}")
+    return And(
+        amount > 0,
+        addedSharesDefinition(shares, amount, s, roundUp=True),
+        amount <= s.liquidity,
+        shares <= s.addedShares,
+        t.addedShares == s.addedShares - shares,
+        t.liquidity == s.liquidity - amount,
+        assetsOut(s) == amount,
+        unchangedExcept(s, t, "addedShares", "liquidity"),
+    )
+
+
+def drawStep(s, t, k):
+    amount = Int(f"drawAmount_{k}")
+    drawnShares = divUp(toRay(amount), s.drawnIndex)
+    return And(
+        amount > 0,
+        amount <= s.liquidity,
+        t.drawnShares == s.drawnShares + drawnShares,
+        t.liquidity == s.liquidity - amount,
+        unchangedExcept(s, t, "drawnShares", "liquidity"),
+    )
+
+
+def restoreStep(s, t, k):
+    drawnAmount = Int(f"restoreDrawnAmount_{k}")
+    restoredPremiumRay = Int(f"restoreRestoredPremiumRay_{k}")
+    drawnShares = toRay(drawnAmount) / s.drawnIndex
+    return And(
+        0 <= drawnAmount,
+        0 <= restoredPremiumRay,
+        Or(drawnAmount > 0, restoredPremiumRay > 0),
+        drawnAmount <= rayMulUp(s.drawnShares, s.drawnIndex),
+        applyPremiumDelta(s, t, k, restoredPremiumRay),
+        t.drawnShares == s.drawnShares - drawnShares,
+        t.liquidity == s.liquidity + drawnAmount + fromRayUp(restoredPremiumRay),
+        unchangedExcept(
+            s, t, "drawnShares", "premiumShares", "premiumOffsetRay", "liquidity"
+        ),
+    )
+
+
+def reportDeficitStep(s, t, k):
+    drawnAmount = Int(f"reportDeficitDrawnAmount_{k}")
+    restoredPremiumRay = Int(f"reportDeficitRestoredPremiumRay_{k}")
+    drawnShares = toRay(drawnAmount) / s.drawnIndex
+    return And(
+        0 <= drawnAmount,
+        0 <= restoredPremiumRay,
+        Or(drawnAmount > 0, restoredPremiumRay > 0),
+        drawnAmount <= rayMulUp(s.drawnShares, s.drawnIndex),
+        applyPremiumDelta(s, t, k, restoredPremiumRay),
+        t.drawnShares == s.drawnShares - drawnShares,
+        t.deficitRay == s.deficitRay + drawnShares * s.drawnIndex + restoredPremiumRay,
+        unchangedExcept(
+            s, t, "drawnShares", "premiumShares", "premiumOffsetRay", "deficitRay"
+        ),
+    )
+
+
+def eliminateDeficitStep(s, t, k):
+    amount = Int(f"eliminateDeficitAmount_{k}")
+    # single spoke model: the covered spoke's deficit is the whole asset deficit
+    deficit = Int(f"eliminateDeficitDeficit_{k}")
+    deficitAmountRay = Int(f"eliminateDeficitAmountRay_{k}")
+    deficitAmount = Int(f"eliminateDeficitAmountUp_{k}")
+    shares = Int(f"eliminateDeficitShares_{k}")
+    return And(
+        amount >= 0,
+        mulDivDefinition(deficit, s.deficitRay, 1, RAY, roundUp=True),
+        deficitAmountRay == If(amount < deficit, toRay(amount), s.deficitRay),
+        mulDivDefinition(deficitAmount, deficitAmountRay, 1, RAY, roundUp=True),
+        addedSharesDefinition(shares, deficitAmount, s, roundUp=True),
+        deficitAmountRay > 0,
+        shares <= s.addedShares,
+        t.addedShares == s.addedShares - shares,
+        t.deficitRay == s.deficitRay - deficitAmountRay,
+        assetsOut(s) == deficitAmount,
+        unchangedExcept(s, t, "addedShares", "deficitRay"),
+    )
+
+
+def mintFeeSharesStep(s, t, k):
+    shares = Int(f"feeShares_{k}")
+    return And(
+        addedSharesDefinition(shares, s.realizedFees, s, roundUp=False),
+        If(
+            shares == 0,
+            unchangedExcept(s, t),
+            And(
+                t.addedShares == s.addedShares + shares,
+                t.realizedFees == 0,
+                unchangedExcept(s, t, "addedShares", "realizedFees"),
+            ),
+        ),
+    )
+
+
+def accrueStep(s, t, k):
+    unrealizedFees = percentMulDown(
+        fromRayUp(s.aggregatedOwedRay(t.drawnIndex)) - fromRayUp(s.aggregatedOwedRay()),
+        s.liquidityFee,
+    )
+    return And(
+        s.drawnIndex <= t.drawnIndex,
+        Implies(
+            And(s.drawnShares == 0, s.premiumShares == 0), t.drawnIndex == s.drawnIndex
+        ),
+        t.realizedFees == s.realizedFees + unrealizedFees,
+        unchangedExcept(s, t, "realizedFees", "drawnIndex"),
+    )
+
+
+OPERATIONS = [
+    addStep,
+    removeStep,
+    drawStep,
+    restoreStep,
+    reportDeficitStep,
+    eliminateDeficitStep,
+    mintFeeSharesStep,
+    accrueStep,
+]
+
+
+def step(s, t, k):
+    """Symbolic step relation from state s to state t; op_k selects the operation."""
+    op = Int(f"op_{k}")
+    return And(
+        0 <= op,
+        op < len(OPERATIONS),
+        And(
+            [
+                Implies(op == i, operation(s, t, k))
+                for i, operation in enumerate(OPERATIONS)
+            ]
+        ),
+        Implies(And(op != REMOVE, op != ELIMINATE_DEFICIT), assetsOut(s) == 0),
+        validState(t),
+    )
+
+
+# Transition properties P(s, t), checked in order: once proven, a property is asserted
+# and helps discharge the next ones.
+
+
+def totalAddedAssetsOnlyDecreasesByAssetsOut(s, t):
+    return t.totalAddedAssets() + assetsOut(s) >= s.totalAddedAssets()
+
+
+def sharePriceDoesNotDecrease(s, t):
+    # equivalent to the cross-multiplied form, but keeps the query linear in totalAddedAssets
+    # for the operations that do not touch addedShares
+    return If(
+        t.addedShares == s.addedShares,
+        t.totalAddedAssets() >= s.totalAddedAssets(),
+        (t.totalAddedAssets() + VIRTUAL_ASSETS) * (s.addedShares + VIRTUAL_SHARES)
+        >= (s.totalAddedAssets() + VIRTUAL_ASSETS) * (t.addedShares + VIRTUAL_SHARES),
+    )
+
+
+def drawnIndexDoesNotDecrease(s, t):
+    return s.drawnIndex <= t.drawnIndex
+
+
+PROPERTIES = [
+    ("drawnIndex does not decrease", drawnIndexDoesNotDecrease),
+    (
+        "totalAddedAssets only decreases by the assets paid out",
+        totalAddedAssetsOnlyDecreasesByAssetsOut,
+    ),
+    ("share price does not decrease", sharePriceDoesNotDecrease),
+]
+
+
+def printTrace(m, states):
+    for k, state in enumerate(states):
+        if k > 0:
+            print(
+                f"  -- {OPERATION_NAMES[m.eval(Int(f'op_{states[k - 1].step}')).as_long()]} -->"
+            )
+        print(
+            f"  s{k}: "
+            + ", ".join(
+                f"{field}={m.eval(getattr(state, field))}" for field in STATE_FIELDS
+            )
+        )
+
+
+def checkProperty(solver, s, t, description, property, kind, hypotheses):
+    """Case splits the last transition on its operation, using assumptions on the shared solver."""
+    op = Int(f"op_{s.step}")
+    results = [
+        check(
+            solver,
+            f"{description} ({OPERATION_NAMES[i]})",
+            kind,
+            op == i,
+            Not(property(s, t)),
+            *hypotheses,
+        )
+        for i in range(len(OPERATIONS))
+    ]
+    if sat in results:
+        # re-check so that the model belongs to the failing operation
+        return solver.check(op == results.index(sat), Not(property(s, t)), *hypotheses)
+    return unknown if unknown in results else unsat
+
+
+def checkTransition(solver, states, properties, label, kind="valid", hypotheses={}):
+    """Checks the properties on the last transition and asserts each valid one for reuse."""
+    s, t = states[-2], states[-1]
+    depth = len(states) - 1
+    results = {}
+    for name, property in properties:
+        description = f"{label} depth {depth}: {name}"
+        hypothesis = [hypotheses[name]] if name in hypotheses else []
+        result = checkProperty(solver, s, t, description, property, kind, hypothesis)
+        results[name] = result
+        if result == unsat and name in hypotheses:
+            # only an induction hypothesis until the base case also holds at this depth
+            solver.add(Implies(hypotheses[name], property(s, t)))
+        elif result == unsat:
+            solver.add(property(s, t))
+        elif result == sat and kind == "induction":
+            # a counterexample to induction: the start state need not be reachable
+            print(f"❓ {label}: '{name}' not inductive at depth {depth}.")
+        elif result == sat:
+            print(f"❌ {label}: '{name}' violated at step {depth}:")
+            printTrace(solver.model(), states)
+        else:
+            print(f"❓ {label}: '{name}' unknown at step {depth}.")
+    return results
+
+
+def boundedModelCheck(properties, maxDepth, timeout):
+    """Base case: from the initial state, no property is violated within maxDepth steps."""
+    solver = Solver()
+    if not RLIMIT:
+        solver.set("timeout", timeout)
+    states = [AssetState(0)]
+    solver.add(initialState(states[0]))
+    holdsUpTo = {name: 0 for name, _ in properties}
+    for k in range(maxDepth):
+        states.append(AssetState(k + 1))
+        solver.add(step(states[k], states[k + 1], k))
+        results = checkTransition(solver, states, properties, "BMC")
+        for name, result in results.items():
+            if result == unsat and holdsUpTo[name] == k:
+                holdsUpTo[name] = k + 1
+        print(
+            f"BMC depth {k + 1}: "
+            + ", ".join(f"{name}: {r}" for name, r in results.items())
+        )
+    return holdsUpTo
+
+
+def inductiveStep(properties, maxDepth, timeout, holdsUpTo):
+    """Inductive step: from any valid state, k good transitions imply a good (k+1)-th one."""
+    solver = Solver()
+    if not RLIMIT:
+        solver.set("timeout", timeout)
+    # P on the earlier transitions is the induction hypothesis of P only; it is enabled by
+    # assumption while P is checked and asserted for good once P is proven inductive and the
+    # base case holds up to the same depth (otherwise P is not an invariant)
+    hypotheses = {name: Bool(f"hypothesis {name}") for name, _ in properties}
+    states = [AssetState("i0")]
+    solver.add(validState(states[0]))
+    provenAt = {}
+    invariants = set()
+    for k in range(maxDepth):
+        if k > 0:
+            for name, property in properties:
+                solver.add(
+                    Implies(hypotheses[name], property(states[k - 1], states[k]))
+                )
+        states.append(AssetState(f"i{k + 1}"))
+        solver.add(step(states[k], states[k + 1], f"i{k}"))
+        # invariants still strengthen deeper unrollings
+        for name, property in properties:
+            if name in invariants:
+                solver.add(property(states[k], states[k + 1]))
+        results = {}
+        # one at a time, so an invariant established here already helps the next property
+        for name, property in properties:
+            if name in provenAt:
+                continue
+            results |= checkTransition(
+                solver,
+                states,
+                [(name, property)],
+                "k-induction",
+                "induction",
+                hypotheses,
+            )
+            result = results[name]
+            if result == unsat:
+                provenAt[name] = k + 1
+            if result == unsat and holdsUpTo[name] >= k + 1:
+                invariants.add(name)
+                solver.add(hypotheses[name])
+            elif result == unsat:
+                print(
+                    f"❓ k-induction: '{name}' is {k + 1}-inductive but its base case only "
+                    f"holds up to depth {holdsUpTo[name]}, so the other properties do not "
+                    "assume it."
+                )
+        print(
+            f"k-induction depth {k + 1}: "
+            + ", ".join(f"{name}: {r}" for name, r in results.items())
+        )
+        if len(provenAt) == len(properties):
+            break
+    return provenAt
+
+
+if __name__ == "__main__":
+    maxDepth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    timeout = int(sys.argv[2]) if len(sys.argv) > 2 else 60_000
+
+    holdsUpTo = boundedModelCheck(PROPERTIES, maxDepth, timeout)
+    provenAt = inductiveStep(PROPERTIES, maxDepth, timeout, holdsUpTo)
+
+    for name, _ in PROPERTIES:
+        propertyDescriptionOutput = f"-- INVARIANT: {name} --"
+        print("=" * len(propertyDescriptionOutput))
+        print(propertyDescriptionOutput)
+        if name in provenAt and holdsUpTo[name] >= provenAt[name]:
+            print(f"✅ Holds for all operation sequences ({provenAt[name]}-induction).")
+        elif holdsUpTo[name] == maxDepth:
+            print(
+                f"✅ Holds for all sequences of up to {maxDepth} operations (not proven inductive)."
+            )
+        else:
+            print(
+                f"❌ Only established for sequences of up to {holdsUpTo[name]} operations."
+            )
+        print("=" * len(propertyDescriptionOutput))
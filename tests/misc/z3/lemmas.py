@@ -0,0 +1,209 @@
+# Helper lemmas about mulDiv rounding and the share/asset conversions, proven once over fresh
+# variables and then handed to larger proofs as quantifier-free facts about their own terms.
+#
+# A lemma is a function of z3 terms returning (hypotheses, conclusion). Decorated with @lemma,
+# calling it proves the general statement (once) and returns Implies(And(hypotheses), conclusion)
+# instantiated on the given terms. Since the instantiation goes through the same commons helpers
+# the proof script uses, the fact is stated on exactly the terms the script builds, e.g.
+#
+#   s.add(toAddedSharesRoundTrip(shares, totalAddedAssets, addedShares))
+#
+# Proven statements are cached by the hash of their SMT-LIB text in .lemma_cache.json, so a lemma
+# is only proven again when its statement changes. Lemmas are proven in a separate z3 context, so
+# the queries of the proof script behave the same with or without the cache.
+import hashlib
+import inspect
+import json
+import os
+
+from commons import *
+
+CACHE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".lemma_cache.json"
+)
+
+
+def _loadCache():
+    if not os.path.exists(CACHE_FILE):
+        return set()
+    with open(CACHE_FILE) as f:
+        return set(json.load(f))
+
+
+_proven = _loadCache()
+
+
+def _prove(name, statement):
+    digest = hashlib.sha256(statement.sexpr().encode()).hexdigest()
+    if digest in _proven:
+        return
+    # prove in a context of its own: solving in the caller's context would change how z3 searches
+    # the caller's later queries, depending on whether the lemma was cached
+    context = Context()
+    result = check(
+        Solver(ctx=context), f"lemma {name}", "valid", Not(statement).translate(context)
+    )
+    if result != unsat:
+        raise RuntimeError(f"lemma {name} could not be proven ({result})")
+    _proven.add(digest)
+    # proof scripts may run concurrently, so replace the cache file atomically
+    temporaryFile = f"{CACHE_FILE}.{os.getpid()}"
+    with open(temporaryFile, "w") as f:
+        json.dump(sorted(_proven), f, indent=2)
+    os.replace(temporaryFile, CACHE_FILE)
+
+
+def lemma(f):
+    parameters = inspect.signature(f).parameters
+
+    def instantiate(*terms):
+        hypotheses, conclusion = f(*[Int(f"{f.__name__}.{p}") for p in parameters])
+        _prove(f.__name__, Implies(And(hypotheses), conclusion))
+        hypotheses, conclusion = f(*terms)
+        return Implies(And(hypotheses), conclusion)
+
+    instantiate.__name__ = f.__name__
+    instantiate.__doc__ = f.__doc__
+    return instantiate
+
+
+def _sharePrice(totalAddedAssets, addedShares):
+    return [0 <= totalAddedAssets, 0 <= addedShares]
+
+
+# Share price between 1 and MAX_SUPPLY_PRICE, as assumed by the liquidation proofs.
+def _boundedSharePrice(totalAddedAssets, addedShares):
+    return [
+        0 <= addedShares,
+        addedShares + VIRTUAL_SHARES <= totalAddedAssets + VIRTUAL_ASSETS,
+        totalAddedAssets + VIRTUAL_ASSETS
+        <= MAX_SUPPLY_PRICE * (addedShares + VIRTUAL_SHARES),
+    ]
+
+
+@lemma
+def mulDivRounding(a, num, den):
+    """mulDivDown(a, num, den) <= mulDivUp(a, num, den) <= mulDivDown(a, num, den) + 1"""
+    down, up = mulDivDown(a, num, den), mulDivUp(a, num, den)
+    return [0 <= a, 0 <= num, 0 < den], And(down <= up, up <= down + 1)
+
+
+@lemma
+def mulDivDownMonotone(a, b, num, den):
+    """a <= b implies mulDivDown(a, num, den) <= mulDivDown(b, num, den)"""
+    return [0 <= a, a <= b, 0 <= num, 0 < den], mulDivDown(a, num, den) <= mulDivDown(
+        b, num, den
+    )
+
+
+@lemma
+def mulDivUpMonotone(a, b, num, den):
+    """a <= b implies mulDivUp(a, num, den) <= mulDivUp(b, num, den)"""
+    return [0 <= a, a <= b, 0 <= num, 0 < den], mulDivUp(a, num, den) <= mulDivUp(
+        b, num, den
+    )
+
+
+@lemma
+def mulDivGalois(a, b, num, den):
+    """b <= mulDivDown(a, num, den) if and only if mulDivUp(b, den, num) <= a"""
+    return [0 <= a, 0 <= b, 0 < num, 0 < den], (b <= mulDivDown(a, num, den)) == (
+        mulDivUp(b, den, num) <= a
+    )
+
+
+@lemma
+def toAddedSharesRoundTrip(shares, totalAddedAssets, addedShares):
+    """toAddedSharesUp(toAddedAssetsDown(shares)) <= shares"""
+    assets = toAddedAssetsDown(shares, totalAddedAssets, addedShares)
+    return [0 <= shares] + _sharePrice(totalAddedAssets, addedShares), (
+        toAddedSharesUp(assets, totalAddedAssets, addedShares) <= shares
+    )
+
+
+@lemma
+def toAddedSharesRoundTripExact(shares, totalAddedAssets, addedShares):
+    """toAddedSharesUp(toAddedAssetsDown(shares)) == shares if a share is worth at least one asset"""
+    assets = toAddedAssetsDown(shares, totalAddedAssets, addedShares)
+    return [
+        0 <= shares,
+        0 <= addedShares,
+        addedShares + VIRTUAL_SHARES <= totalAddedAssets + VIRTUAL_ASSETS,
+    ], toAddedSharesUp(assets, totalAddedAssets, addedShares) == shares
+
+
+@lemma
+def toAddedAssetsRoundTrip(assets, totalAddedAssets, addedShares):
+    """toAddedAssetsDown(toAddedSharesDown(assets)) <= assets"""
+    shares = toAddedSharesDown(assets, totalAddedAssets, addedShares)
+    return [0 <= assets] + _sharePrice(totalAddedAssets, addedShares), (
+        toAddedAssetsDown(shares, totalAddedAssets, addedShares) <= assets
+    )
+
+
+@lemma
+def toAddedAssetsBounds(shares, totalAddedAssets, addedShares):
+    """shares <= toAddedAssetsDown(shares) <= toAddedAssetsUp(shares) <= MAX_SUPPLY_PRICE * shares"""
+    down = toAddedAssetsDown(shares, totalAddedAssets, addedShares)
+    up = toAddedAssetsUp(shares, totalAddedAssets, addedShares)
+    return [0 <= shares] + _boundedSharePrice(totalAddedAssets, addedShares), And(
+        shares <= down, down <= up, up <= MAX_SUPPLY_PRICE * shares
+    )
+
+
+@lemma
+def toAddedSharesBounds(assets, totalAddedAssets, addedShares):
+    """assets < MAX_SUPPLY_PRICE * (toAddedSharesDown(assets) + 1), toAddedSharesUp(assets) <= assets"""
+    down = toAddedSharesDown(assets, totalAddedAssets, addedShares)
+    up = toAddedSharesUp(assets, totalAddedAssets, addedShares)
+    return [0 <= assets] + _boundedSharePrice(totalAddedAssets, addedShares), And(
+        assets < MAX_SUPPLY_PRICE * (down + 1), down <= up, up <= assets
+    )
+
+
+@lemma
+def decimalsUnit(decimals):
+    """ToInt(10**decimals) is one of the units from MIN_DECIMALS to MAX_DECIMALS"""
+    return [MIN_DECIMALS <= decimals, decimals <= MAX_DECIMALS], Or(
+        [
+            And(decimals == d, ToInt(10**decimals) == 10**d)
+            for d in range(MIN_DECIMALS.as_long(), MAX_DECIMALS.as_long() + 1)
+        ]
+    )
+
+
+def toAddedAssetsRounding(shares, totalAddedAssets, addedShares):
+    return mulDivRounding(
+        shares, totalAddedAssets + VIRTUAL_ASSETS, addedShares + VIRTUAL_SHARES
+    )
+
+
+def toAddedSharesRounding(assets, totalAddedAssets, addedShares):
+    return mulDivRounding(
+        assets, addedShares + VIRTUAL_SHARES, totalAddedAssets + VIRTUAL_ASSETS
+    )
+
+
+def toAddedSharesDownMonotone(a, b, totalAddedAssets, addedShares):
+    return mulDivDownMonotone(
+        a, b, addedShares + VIRTUAL_SHARES, totalAddedAssets + VIRTUAL_ASSETS
+    )
+
+
+def toAddedSharesUpMonotone(a, b, totalAddedAssets, addedShares):
+    return mulDivUpMonotone(
+        a, b, addedShares + VIRTUAL_SHARES, totalAddedAssets + VIRTUAL_ASSETS
+    )
+
+
+def toAddedAssetsDownMonotone(a, b, totalAddedAssets, addedShares):
+    return mulDivDownMonotone(
+        a, b, totalAddedAssets + VIRTUAL_ASSETS, addedShares + VIRTUAL_SHARES
+    )
+
+
+# shares <= toAddedSharesDown(assets) if and only if toAddedAssetsUp(shares) <= assets
+def toAddedSharesGalois(assets, shares, totalAddedAssets, addedShares):
+    return mulDivGalois(
+        assets, shares, addedShares + VIRTUAL_SHARES, totalAddedAssets + VIRTUAL_ASSETS
+    )
@@ -1,5 +1,5 @@
 # Highlights the fact that debtToLiquidate cannot exceed debtReserveBalance in liquidation logic.
-from commons import *
+from lemmas import *
 
 s = Solver()
 
@@ -17,6 +17,7 @@ s.add(1 <= collateralAssetPrice, collateralAssetPrice <= MAX_PRICE)
 collateralAssetDecimals = Int("collateralAssetDecimals")
 s.add(MIN_DECIMALS <= collateralAssetDecimals, collateralAssetDecimals <= MAX_DECIMALS)
 collateralAssetUnit = ToInt(10**collateralAssetDecimals)
+s.add(decimalsUnit(collateralAssetDecimals))
 
 # Pricing of debt asset
 drawnIndex = Int("drawnIndex")
@@ -26,6 +27,7 @@ s.add(1 <= debtAssetPrice, debtAssetPrice <= MAX_PRICE)
 debtAssetDecimals = Int("debtAssetDecimals")
 s.add(MIN_DECIMALS <= debtAssetDecimals, debtAssetDecimals <= MAX_DECIMALS)
 debtAssetUnit = ToInt(10**debtAssetDecimals)
+s.add(decimalsUnit(debtAssetDecimals))
 
 # Liquidatable user position
 suppliedShares = Int("suppliedShares")
@@ -75,14 +77,20 @@ s.add(
 )
 
 # Calculate collateral shares to liquidate
+initialDebtRayToLiquidate = drawnSharesToLiquidate * drawnIndex + premiumDebtRayToLiquidate
+collateralToLiquidate = mulDivDown(
+    initialDebtRayToLiquidate,
+    debtAssetPrice * collateralAssetUnit * liquidationBonus,
+    debtAssetUnit * collateralAssetPrice * PERCENTAGE_FACTOR * RAY,
+)
 collateralSharesToLiquidate = previewAddByAssets(
-    mulDivDown(
-        drawnSharesToLiquidate * drawnIndex + premiumDebtRayToLiquidate,
-        debtAssetPrice * collateralAssetUnit * liquidationBonus,
-        debtAssetUnit * collateralAssetPrice * PERCENTAGE_FACTOR * RAY,
-    ),
-    totalAddedAssets,
-    addedShares,
+    collateralToLiquidate, totalAddedAssets, addedShares
+)
+s.add(toAddedSharesBounds(collateralToLiquidate, totalAddedAssets, addedShares))
+s.add(
+    toAddedSharesGalois(
+        collateralToLiquidate, suppliedShares, totalAddedAssets, addedShares
+    )
 )
 
 # Enforce recalculation of debt to liquidate
@@ -110,8 +118,23 @@ s.add(
 )
 
 # Recalculate debt to liquidate
+suppliedAssets = previewAddByShares(suppliedShares, totalAddedAssets, addedShares)
+s.add(toAddedAssetsBounds(suppliedShares, totalAddedAssets, addedShares))
+s.add(
+    toAddedAssetsBounds(
+        suppliedShares - collateralSharesToLiquidate, totalAddedAssets, addedShares
+    )
+)
+s.add(
+    mulDivGalois(
+        initialDebtRayToLiquidate,
+        suppliedAssets,
+        debtAssetPrice * collateralAssetUnit * liquidationBonus,
+        collateralAssetPrice * debtAssetUnit * PERCENTAGE_FACTOR * RAY,
+    )
+)
 debtRayToLiquidate = mulDivUp(
-    previewAddByShares(suppliedShares, totalAddedAssets, addedShares),
+    suppliedAssets,
     collateralAssetPrice * debtAssetUnit * PERCENTAGE_FACTOR * RAY,
     debtAssetPrice * collateralAssetUnit * liquidationBonus,
 )
@@ -122,6 +145,8 @@ recalculatedDrawnSharesToLiquidate = divUp(
     debtRayToLiquidate - premiumDebtRay, drawnIndex
 )
 
+# LiquidationLogic caps drawnSharesToLiquidate to drawnShares here, which can bind due to rounding
+# (z3 returns unknown on this query even within a 200M rlimit budget)
 proveSatisfiable(
     s,
     "Recalculated drawnSharesToLiquidate can exceed user's drawn shares",
@@ -130,18 +155,24 @@ proveSatisfiable(
 
 # Enforce recalculation of collateralSharesToLiquidate
 s.add(recalculatedDrawnSharesToLiquidate > drawnShares)
+recalculatedCollateralToLiquidate = mulDivDown(
+    drawnShares * drawnIndex + premiumDebtRay,
+    debtAssetPrice * collateralAssetUnit * liquidationBonus,
+    debtAssetUnit * collateralAssetPrice * PERCENTAGE_FACTOR * RAY,
+)
 recalculatedCollateralSharesToLiquidate = previewAddByAssets(
-    mulDivDown(
-        drawnShares * drawnIndex + premiumDebtRay,
-        debtAssetPrice * collateralAssetUnit * liquidationBonus,
-        debtAssetUnit * collateralAssetPrice * PERCENTAGE_FACTOR * RAY,
-    ),
-    totalAddedAssets,
-    addedShares,
+    recalculatedCollateralToLiquidate, totalAddedAssets, addedShares
+)
+s.add(
+    toAddedSharesBounds(
+        recalculatedCollateralToLiquidate, totalAddedAssets, addedShares
+    )
 )
 
+# LiquidationLogic caps collateralSharesToLiquidate to suppliedShares here, which should never bind
 proveSatisfiable(
     s,
     "Recalculated collateralSharesToLiquidate can exceed user's supplied shares",
     recalculatedCollateralSharesToLiquidate > suppliedShares,
+    expected=unsat,
 )
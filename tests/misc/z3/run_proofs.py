@@ -0,0 +1,192 @@
+# Runs the proof scripts of this directory under deterministic z3 resource budgets.
+#
+# Every check made through commons.check() (proveValid/proveSatisfiable) gets the same rlimit
+# budget instead of a wall-clock timeout, so a property's outcome does not depend on how loaded
+# the machine is. Checks known to need more get their own budget from RLIMIT_OVERRIDES (or
+# --rlimit-override) rather than being weakened to fit the default. The rlimit count and memory
+# used by each property are recorded in a history file; on the next run scripts are started
+# longest-first (by recorded rlimit, unseen scripts first) over the worker pool, which keeps the
+# slowest script from stretching the total time.
+# Each worker process is capped in memory (address space, plus z3's own memory_max_size) so a
+# runaway nonlinear query fails alone instead of exhausting the machine.
+#
+# Only the scripts of this directory are run. The older z3 scripts in tests/misc call s.check()
+# directly, so they get neither the rlimit budget nor a cost history.
+#
+# Usage: python run_proofs.py [--workers N] [--rlimit N] [--rlimit-override SCRIPT[:PROPERTY]=N]
+#                             [--memory-mb N] [--history PATH] [script ...]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+NOT_PROOFS = {"bisect_proofs.py", "commons.py", "lemmas.py", "run_proofs.py"}
+
+DEFAULT_RLIMIT = 5_000_000
+DEFAULT_MEMORY_MB = 4096
+DEFAULT_HISTORY = os.path.join(DIRECTORY, ".proof_costs.json")
+
+# Budgets replacing the default, by script and property description ("*" for the other checks of
+# the script), e.g. {"liquidation_logic.py": {"Recalculated ...": 50_000_000}}
+RLIMIT_OVERRIDES = {}
+
+
+def proofScripts():
+    return sorted(f for f in os.listdir(DIRECTORY) if f.endswith(".py") and f not in NOT_PROOFS)
+
+
+def loadHistory(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def estimatedCost(history, script):
+    properties = history.get(script, {}).get("properties")
+    if not properties:
+        return float("inf")
+    return sum(p["rlimit"] for p in properties.values())
+
+
+def parseRlimitOverride(override):
+    """SCRIPT[:PROPERTY]=N -> (script, property or "*", N)"""
+    target, _, rlimit = override.rpartition("=")
+    script, _, property = target.partition(":")
+    return script, property or "*", int(rlimit)
+
+
+def rlimitBudgets(script, default, overrides=RLIMIT_OVERRIDES):
+    """The rlimit budget of script's checks and the per-property overrides on top of it."""
+    budgets = dict(overrides.get(script, {}))
+    return budgets.pop("*", default), budgets
+
+
+def passed(record):
+    # checks without an expected result (e.g. k-induction attempts) only report their cost
+    return record["expected"] is None or record["result"] == record["expected"]
+
+
+# The address space cap is applied by the child itself before it runs the script: preexec_fn is
+# not safe to use from the worker threads.
+LIMITED_RUNNER = """
+import resource, runpy, sys
+limit = int(sys.argv[1]) * 1024 * 1024
+resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+sys.argv = sys.argv[2:]
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+
+def runScript(script, rlimit, memoryMb, overrides):
+    with tempfile.NamedTemporaryFile(suffix=".jsonl", delete=False) as statsFile:
+        statsPath = statsFile.name
+    rlimit, rlimits = rlimitBudgets(script, rlimit, overrides)
+    env = dict(
+        os.environ,
+        Z3_RLIMIT=str(rlimit),
+        Z3_RLIMITS=json.dumps(rlimits),
+        # leave z3 some headroom below the hard cap so it can give up cleanly
+        Z3_MEMORY_MAX_MB=str(memoryMb * 3 // 4),
+        Z3_STATS_FILE=statsPath,
+    )
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", LIMITED_RUNNER, str(memoryMb), script],
+        cwd=DIRECTORY,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    seconds = time.perf_counter() - start
+    with open(statsPath) as f:
+        records = [json.loads(line) for line in f]
+    os.remove(statsPath)
+    return {
+        "returncode": completed.returncode,
+        "output": completed.stdout + completed.stderr,
+        "seconds": seconds,
+        "records": records,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("scripts", nargs="*", help="defaults to every proof script")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--rlimit", type=int, default=DEFAULT_RLIMIT, help="per check")
+    parser.add_argument(
+        "--rlimit-override",
+        action="append",
+        default=[],
+        metavar="SCRIPT[:PROPERTY]=N",
+        help="budget for one script or one of its properties",
+    )
+    parser.add_argument("--memory-mb", type=int, default=DEFAULT_MEMORY_MB, help="per worker")
+    parser.add_argument("--history", default=DEFAULT_HISTORY)
+    parser.add_argument("--verbose", action="store_true", help="print script outputs")
+    args = parser.parse_args()
+
+    history = loadHistory(args.history)
+    overrides = {script: dict(budgets) for script, budgets in RLIMIT_OVERRIDES.items()}
+    for override in args.rlimit_override:
+        script, property, rlimit = parseRlimitOverride(override)
+        overrides.setdefault(script, {})[property] = rlimit
+    scripts = args.scripts or proofScripts()
+    # longest processing time first
+    scripts.sort(key=lambda script: estimatedCost(history, script), reverse=True)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        runs = dict(
+            zip(
+                scripts,
+                pool.map(lambda s: runScript(s, args.rlimit, args.memory_mb, overrides), scripts),
+            )
+        )
+    makespan = time.perf_counter() - start
+
+    failed = False
+    for script, run in runs.items():
+        records = run["records"]
+        ok = run["returncode"] == 0 and all(passed(r) for r in records)
+        failed |= not ok
+        print(
+            f"{'✅' if ok else '❌'} {script}: {len(records)} checks, "
+            f"{sum(r['rlimit'] for r in records):,} rlimit, "
+            f"{max((r['memory'] for r in records), default=0):.0f} MB, {run['seconds']:.1f}s"
+        )
+        for r in records:
+            if not passed(r):
+                print(
+                    f"    {r['result']} (expected {r['expected']}, {r['kind']}, "
+                    f"{r['rlimit']:,} rlimit): {r['property']}"
+                )
+        if run["returncode"] != 0:
+            print(f"    exited with {run['returncode']}")
+        if args.verbose or run["returncode"] != 0:
+            print(run["output"])
+        history[script] = {
+            "seconds": run["seconds"],
+            "properties": {
+                r["property"]: {k: r[k] for k in ("kind", "result", "rlimit", "memory")}
+                for r in records
+            },
+        }
+
+    sequential = sum(run["seconds"] for run in runs.values())
+    print(f"Total {makespan:.1f}s on {args.workers} workers ({sequential:.1f}s of work)")
+
+    with open(args.history, "w") as f:
+        json.dump(history, f, indent=2, sort_keys=True)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
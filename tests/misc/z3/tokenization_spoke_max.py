@@ -0,0 +1,109 @@
+# Proves that the ERC4626 max* functions of TokenizationSpoke only return amounts the Hub accepts.
+#
+# The vault state (Hub asset totals, the spoke's config and added shares, the owner's balance) is
+# encoded once and the max*/preview* functions are written on top of it exactly as in
+# TokenizationSpoke.sol, including the inactive/halted and uncapped branches. Every obligation is
+# then checked on the same solver under its own assumption, so z3 keeps what it learned about the
+# shared terms between obligations.
+#
+# A new assumption on the vault state is one line in INVARIANTS, a new property one line in
+# OBLIGATIONS. The round-trip obligations keep the descriptions they had in the per-function
+# max_*_property.py scripts this replaces, so run_proofs.py and bisect_proofs.py still match them.
+from lemmas import *
+
+UINT256_MAX = IntVal(2**256 - 1)
+
+totalAddedAssets = Int("totalAddedAssets")
+totalAddedShares = Int("totalAddedShares")
+spokeShares = Int("spokeShares")  # totalSupply() == spoke.addedShares
+ownerShares = Int("ownerShares")  # balanceOf(owner)
+liquidity = Int("liquidity")
+allowed = Int("allowed")  # addCap * ASSET_UNITS
+uncapped = Bool("uncapped")  # addCap == MAX_ALLOWED_SPOKE_CAP
+active = Bool("active")
+halted = Bool("halted")
+
+paused = Or(Not(active), halted)
+
+
+def previewMint(shares):
+    return previewAddByShares(shares, totalAddedAssets, totalAddedShares)
+
+
+def previewWithdraw(assets):
+    return previewRemoveByAssets(assets, totalAddedAssets, totalAddedShares)
+
+
+def convertToShares(assets):
+    return previewAddByAssets(assets, totalAddedAssets, totalAddedShares)
+
+
+def convertToAssets(shares):
+    return previewRemoveByShares(shares, totalAddedAssets, totalAddedShares)
+
+
+previewRedeem = convertToAssets
+
+maxDeposit = If(
+    paused, 0, If(uncapped, UINT256_MAX, zeroFloorSub(allowed, previewMint(spokeShares)))
+)
+maxMint = If(maxDeposit == UINT256_MAX, UINT256_MAX, convertToShares(maxDeposit))
+maxRemovableAssets = If(paused, 0, liquidity)
+maxWithdraw = min(convertToAssets(ownerShares), maxRemovableAssets)
+maxRemovableShares = convertToShares(maxRemovableAssets)
+maxRedeem = min(ownerShares, maxRemovableShares)
+
+
+# Hub._validateAdd for a capped spoke: allowed >= toAddedAssetsUp(spoke.addedShares) + amount
+def validAdd(amount):
+    return allowed >= toAddedAssetsUp(spokeShares, totalAddedAssets, totalAddedShares) + amount
+
+
+capped = And(Not(paused), Not(uncapped))
+
+INVARIANTS = [
+    And(0 <= totalAddedAssets, totalAddedAssets <= MAX_SUPPLY_AMOUNT),
+    And(0 <= totalAddedShares, totalAddedShares <= MAX_SUPPLY_AMOUNT),
+    And(0 <= spokeShares, spokeShares <= totalAddedShares),
+    And(0 <= ownerShares, ownerShares <= spokeShares),
+    # liquidity is the part of the added assets that is not drawn
+    And(0 <= liquidity, liquidity <= totalAddedAssets),
+    And(0 < allowed, allowed <= MAX_SUPPLY_AMOUNT),
+]
+
+OBLIGATIONS = [
+    # fmt: off
+    ("deposit(maxDeposit()) satisfies _validateAdd", Implies(And(capped, maxDeposit > 0), validAdd(maxDeposit))),
+    ("mint(maxMint()) satisfies _validateAdd", Implies(And(capped, previewMint(maxMint) > 0), validAdd(previewMint(maxMint)))),
+    ("previewMint(maxMint()) <= maxDeposit()", Implies(capped, previewMint(maxMint) <= maxDeposit)),
+    ("maxDeposit() == 0 once the add cap is reached", Implies(And(Not(uncapped), previewMint(spokeShares) >= allowed), maxDeposit == 0)),
+    ("maxDeposit() and maxMint() are unbounded without a cap", Implies(And(Not(paused), uncapped), And(maxDeposit == UINT256_MAX, maxMint == UINT256_MAX))),
+    ("min(previewRedeem(balanceShares), maxRemovableAssets) <= _maxRemovableAssets()", maxWithdraw <= maxRemovableAssets),
+    ("previewWithdraw(maxWithdraw()) <= balanceShares", previewWithdraw(maxWithdraw) <= ownerShares),
+    ("previewRedeem(balance.min(maxRemovableShares)) <= _maxRemovableAssets()", previewRedeem(maxRedeem) <= maxRemovableAssets),
+    ("toAddedSharesUp(previewRedeem(maxRedeem())) <= balance", previewWithdraw(previewRedeem(maxRedeem)) <= ownerShares),
+    ("maxDeposit() == 0 while the spoke is inactive or halted", Implies(paused, maxDeposit == 0)),
+    ("maxMint() == 0 while the spoke is inactive or halted", Implies(paused, maxMint == 0)),
+    ("maxWithdraw() == 0 while the spoke is inactive or halted", Implies(paused, maxWithdraw == 0)),
+    ("maxRedeem() == 0 while the spoke is inactive or halted", Implies(paused, maxRedeem == 0)),
+    # fmt: on
+]
+
+# Rounding facts about the terms above, proven once in lemmas.py
+LEMMAS = [
+    toAddedSharesGalois(maxDeposit, maxMint, totalAddedAssets, totalAddedShares),
+    toAddedSharesUpMonotone(
+        maxWithdraw, convertToAssets(ownerShares), totalAddedAssets, totalAddedShares
+    ),
+    toAddedSharesRoundTrip(ownerShares, totalAddedAssets, totalAddedShares),
+    toAddedAssetsDownMonotone(maxRedeem, maxRemovableShares, totalAddedAssets, totalAddedShares),
+    toAddedAssetsRoundTrip(maxRemovableAssets, totalAddedAssets, totalAddedShares),
+    toAddedSharesRoundTrip(maxRedeem, totalAddedAssets, totalAddedShares),
+]
+
+s = Solver()
+s.add(INVARIANTS)
+s.add(LEMMAS)
+
+for description, property in OBLIGATIONS:
+    proveValid(s, description, property)